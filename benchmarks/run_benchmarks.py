@@ -0,0 +1,158 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+
+Offline benchmarks of the CI utilities against the in-process fake AWS backend (src/fake_aws.py).
+Run from the repository root with: python -m benchmarks.run_benchmarks --label <version>
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+from src.aws_clients import set_rate_limit
+from src.check_lambda_function_exists import check_lambda_exists, check_lambda_exists_batch
+from src.create_lambda_deployment_json import get_lambda_layer_latest_version, resolve_layers_and_role, create_json
+from src.deployment_manifest import build_manifest
+from src.fake_aws import FakeAWSBackend
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+CREDENTIALS = {'aws_key': 'benchmark', 'aws_secret': 'benchmark', 'region': 'us-east-2'}
+ROLE_NAME = 'Data_Lambda_Full_Access'
+LAYER_NAMES = [f'layer_{index}' for index in range(8)]
+FUNCTION_NAMES = [f'function_{index}' for index in range(150)]
+# parameters of the fake backend, results are only comparable when they are the same
+PARAMETERS = ['latency', 'throttle_rate']
+
+
+def make_backend(latency: float, throttle_rate: float) -> FakeAWSBackend:
+    backend = FakeAWSBackend(latency=latency, throttle_rate=throttle_rate, seed=0)
+    backend.add_role(ROLE_NAME)
+    for layer in LAYER_NAMES:
+        backend.add_layer(layer, versions=3)
+    for function_name in FUNCTION_NAMES:
+        backend.add_function(function_name)
+    return backend
+
+
+def _manifest() -> dict:
+    return {
+        'defaults': {'runtime': 'python3.7', 'role': ROLE_NAME, 'layers': LAYER_NAMES},
+        'functions': [{'function': function_name, 'handler': 'lambda_function.lambda_handler',
+                       'output': os.devnull} for function_name in FUNCTION_NAMES]
+    }
+
+
+WORKLOADS = {
+    'check_lambda_exists_single': lambda: check_lambda_exists(FUNCTION_NAMES[0], CREDENTIALS),
+    'check_lambda_exists_batch_150': lambda: check_lambda_exists_batch(FUNCTION_NAMES, CREDENTIALS),
+    'get_lambda_layer_latest_version_single': lambda: get_lambda_layer_latest_version(LAYER_NAMES[0], CREDENTIALS),
+    'resolve_layers_and_role_8_layers': lambda: resolve_layers_and_role(LAYER_NAMES, ROLE_NAME, CREDENTIALS),
+    'create_json_single': lambda: create_json(function_name=FUNCTION_NAMES[0], runtime='python3.7',
+                                              role='arn:aws:iam::123456789012:role/Data_Lambda_Full_Access',
+                                              handler='lambda_function.lambda_handler', description=None),
+    'build_manifest_150_functions': lambda: build_manifest(_manifest(), CREDENTIALS),
+}
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_workload(workload, iterations: int, latency: float, throttle_rate: float) -> dict:
+    """
+    Times a workload against a fresh fake backend, with fresh rate limiters (the adaptive rate of the previous
+    workload would slow this one down).
+    :param workload: Callable to time
+    :param iterations: Number of timed runs
+    :param latency: Seconds every fake AWS call takes
+    :param throttle_rate: Probability of a fake AWS call being throttled
+    :return: Dictionary with the timings (seconds) and the AWS calls per second
+    """
+    timings = []
+    set_rate_limit()
+    with make_backend(latency, throttle_rate) as backend, patch('builtins.print'):
+        workload()  # warm up the clients
+        calls_before = backend.total_calls()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            workload()
+            timings.append(time.perf_counter() - start)
+        calls = backend.total_calls() - calls_before
+    total = sum(timings)
+    return {
+        'iterations': iterations,
+        'aws_calls': calls,
+        'calls_per_second': calls / total if total else 0.0,
+        'runs_per_second': iterations / total if total else 0.0,
+        'p50': statistics.median(timings),
+        'p99': percentile(timings, 0.99),
+        'mean': statistics.mean(timings)
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    :return: List of messages for the workloads whose p50 got slower than the baseline by more than the threshold.
+    An exception is raised if the baseline was recorded with other backend parameters.
+    """
+    for parameter in PARAMETERS:
+        if baseline.get(parameter) != results[parameter]:
+            raise Exception(f'The baseline {baseline.get("label")} was recorded with {parameter} '
+                            f'{baseline.get(parameter)}, not {results[parameter]}')
+    regressions = []
+    for name, result in results['workloads'].items():
+        previous = baseline.get('workloads', {}).get(name)
+        if previous and previous['p50'] > 0 and result['p50'] > previous['p50'] * (1 + threshold):
+            regressions.append(f'{name}: p50 {previous["p50"] * 1000:.2f}ms -> {result["p50"] * 1000:.2f}ms')
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser('Offline benchmarks of the CI utilities')
+    parser.add_argument('--label', help='Label of the results, eg. the version or commit', required=True)
+    parser.add_argument('--iterations', help='Number of timed runs per workload', type=int, default=20)
+    parser.add_argument('--latency', help='Seconds every fake AWS call takes', type=float, default=0.02)
+    parser.add_argument('--throttle-rate', help='Probability of a fake AWS call being throttled', type=float,
+                        default=0.0)
+    parser.add_argument('--workloads', help='Workloads to run, all of them by default', nargs='+',
+                        choices=sorted(WORKLOADS))
+    parser.add_argument('--baseline', help='Label of earlier results to compare with', default=None)
+    parser.add_argument('--results-dir', help='Directory of the stored results, keep it between runs (eg. as a CI '
+                                              'cache or artifact) to compare versions', default=RESULTS_DIR)
+    parser.add_argument('--threshold', help='Allowed p50 slowdown against the baseline, eg. 0.2 for 20%%',
+                        type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {
+        'label': args.label,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'latency': args.latency,
+        'throttle_rate': args.throttle_rate,
+        'workloads': {}
+    }
+    print(f'{"workload":<42}{"runs/s":>10}{"calls/s":>10}{"p50 ms":>10}{"p99 ms":>10}')
+    for name in args.workloads or sorted(WORKLOADS):
+        result = run_workload(WORKLOADS[name], args.iterations, args.latency, args.throttle_rate)
+        results['workloads'][name] = result
+        print(f'{name:<42}{result["runs_per_second"]:>10.1f}{result["calls_per_second"]:>10.1f}'
+              f'{result["p50"] * 1000:>10.2f}{result["p99"] * 1000:>10.2f}')
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    with open(os.path.join(args.results_dir, f'{args.label}.json'), 'w') as f:
+        json.dump(obj=results, fp=f, indent=4)
+
+    if args.baseline is not None:
+        with open(os.path.join(args.results_dir, f'{args.baseline}.json'), 'r') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
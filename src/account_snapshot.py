@@ -0,0 +1,179 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+"""
+
+import argparse
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from src.aws_clients import get_client, paginate_with_retry, credentials_from_args
+    from src.lookup_cache import default_identity
+except ImportError:
+    from aws_clients import get_client, paginate_with_retry, credentials_from_args
+    from lookup_cache import default_identity
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT_FILE = 'account_snapshot.json'
+
+
+class AccountSnapshot:
+    """
+    Index of the lambda functions, the latest version of every lambda layer and the IAM roles of one account and
+    region, taken with one listing of each. The helpers (check_lambda_exists, get_lambda_layer_latest_version,
+    get_iam_role_arn and their batch versions) take it as snapshot= and answer from it without any AWS call.
+    """
+
+    def __init__(self, functions: list = None, layers: dict = None, roles: dict = None, region: str = None,
+                 created: float = None):
+        """
+        :param functions: Names of the lambda functions
+        :param layers: Dictionary of <layer_name>: <ARN of the latest layer version>
+        :param roles: Dictionary of <role_name>: <role ARN>
+        :param region: The region the snapshot was taken in (IAM is global)
+        :param created: Time the snapshot was taken, as a unix timestamp
+        """
+        self.functions = set(functions or [])
+        self.layers = dict(layers or {})
+        self.roles = dict(roles or {})
+        self.region = region
+        self.created = time.time() if created is None else created
+
+    def function_exists(self, function_name: str) -> int:
+        """
+        :return: 1 if the function exists, 0 if it does not (same as check_lambda_exists)
+        """
+        return 1 if function_name in self.functions else 0
+
+    def layer_arn(self, layer_name: str):
+        """
+        :return: The ARN of the latest version of the layer, None if the layer is not in the snapshot
+        """
+        return self.layers.get(layer_name)
+
+    def role_arn(self, role_name: str):
+        """
+        :return: The ARN of the role, None if the role is not in the snapshot
+        """
+        return self.roles.get(role_name)
+
+    def check_region(self, credentials: dict = None):
+        """
+        Makes sure the snapshot answers for the region the credentials query, the functions and layers of another
+        region are not the ones of this region. An exception is raised if the regions differ (a snapshot or default
+        credentials without a region can not be checked).
+        :param credentials: The aws credentials (same form as take_snapshot), can be None for the default ones
+        """
+        region = credentials['region'] if credentials else default_identity()[1]
+        if self.region is not None and region and region != self.region:
+            raise Exception(f'The snapshot was taken in {self.region}, not in {region}. Take a snapshot of {region}')
+
+    def to_dict(self) -> dict:
+        return {
+            'version': SNAPSHOT_VERSION,
+            'region': self.region,
+            'created': self.created,
+            'functions': sorted(self.functions),
+            'layers': dict(sorted(self.layers.items())),
+            'roles': dict(sorted(self.roles.items()))
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        :param data: Dictionary in the form of to_dict
+        :return: The AccountSnapshot. An exception is raised for a snapshot of another version.
+        """
+        if data.get('version') != SNAPSHOT_VERSION:
+            raise Exception(f'Unsupported snapshot version {data.get("version")}, expected {SNAPSHOT_VERSION}. '
+                            f'Take a new snapshot')
+        return cls(functions=data['functions'], layers=data['layers'], roles=data['roles'], region=data['region'],
+                   created=data['created'])
+
+    def save(self, path: str):
+        """
+        Writes the snapshot as JSON. The file is replaced atomically, readers never see a partial snapshot.
+        """
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(obj=self.to_dict(), fp=f, indent=1)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        :param path: JSON file written by save
+        :return: The AccountSnapshot
+        """
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+
+def take_snapshot(credentials: dict = None, include_roles: bool = True) -> AccountSnapshot:
+    """
+    Pages through list_functions, list_layers and (IAM) list_roles once, at the same time.
+    :param credentials: The aws credentials in the form of
+    {
+        "aws_key": <aws access key id>,
+        "aws_secret": <aws_secret_access_key>,
+        "region": <AWS region>
+    }
+    can be None (in which case the default shall be used)
+    :param include_roles: If False, the roles are not listed (eg. without IAM list permissions)
+    :return: The AccountSnapshot
+    """
+    lambda_client = get_client('lambda', credentials)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        functions_future = executor.submit(
+            lambda: [function['FunctionName'] for function in
+                     paginate_with_retry(lambda_client, 'list_functions', 'Functions', credentials)])
+        layers_future = executor.submit(
+            lambda: {layer['LayerName']: layer['LatestMatchingVersion']['LayerVersionArn'] for layer in
+                     paginate_with_retry(lambda_client, 'list_layers', 'Layers', credentials)
+                     if layer.get('LatestMatchingVersion')})
+        roles_future = executor.submit(
+            lambda: {role['RoleName']: role['Arn'] for role in
+                     paginate_with_retry(get_client('iam', credentials), 'list_roles', 'Roles', credentials)}) \
+            if include_roles else None
+        return AccountSnapshot(functions=functions_future.result(), layers=layers_future.result(),
+                               roles=roles_future.result() if roles_future is not None else {},
+                               region=credentials['region'] if credentials else default_identity()[1] or None)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the command line arguments
+    :param parser: The parser (or sub parser) to add them to
+    """
+    parser.add_argument('--access', help='AWS access key', default=None)
+    parser.add_argument('--secret', help='AWS secret key', default=None)
+    parser.add_argument('--region', help='AWS Region', default='us-east-2')
+    parser.add_argument('--output', help='File to write the snapshot to', default=DEFAULT_SNAPSHOT_FILE)
+    parser.add_argument('--no-roles', help='Do not list the IAM roles', action='store_true')
+
+
+def run(args: argparse.Namespace, parser: argparse.ArgumentParser = None):
+    """
+    Takes the snapshot with the parsed command line arguments (see add_arguments) and writes it
+    """
+    aws_credentials = credentials_from_args(args)
+    print('Taking the snapshot')
+    snapshot = take_snapshot(aws_credentials, include_roles=not args.no_roles)
+    snapshot.save(args.output)
+    print(f'Wrote {len(snapshot.functions)} functions, {len(snapshot.layers)} layers and {len(snapshot.roles)} roles '
+          f'to {args.output}')
+
+
+if __name__ == "__main__":
+    try:
+        parser = argparse.ArgumentParser('Take a snapshot of the lambda functions, layers and roles of an account')
+        add_arguments(parser)
+        run(parser.parse_args(), parser)
+    except SystemExit:
+        raise
+    except:
+        print(f'There was an error in the process. \n{traceback.format_exc()}')
@@ -0,0 +1,117 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from src.account_snapshot import AccountSnapshot
+    from src.check_lambda_function_exists import check_lambda_exists
+    from src.create_lambda_deployment_json import get_iam_role_arn, get_lambda_layer_latest_version, create_json
+    from src.lookup_cache import LookupCache
+except ImportError:
+    from account_snapshot import AccountSnapshot
+    from check_lambda_function_exists import check_lambda_exists
+    from create_lambda_deployment_json import get_iam_role_arn, get_lambda_layer_latest_version, create_json
+    from lookup_cache import LookupCache
+
+
+class AsyncLookups:
+    """
+    Awaitable versions of the lookup helpers, for asyncio code. The helpers run on a thread pool of max_concurrency
+    threads shared by every call, and a semaphore admits at most max_concurrency calls at a time, so any number of
+    lookups can be awaited together (eg. with asyncio.gather). They return the same values as the sync helpers.
+
+    A cancelled call that is still waiting for the semaphore never reaches AWS. A call that already runs on the pool
+    can not be interrupted, the await raises CancelledError at once and the thread finishes the call in the
+    background. Use one instance per event loop, eg.
+
+    async with AsyncLookups(credentials) as lookups:
+        exists = await lookups.check_lambda_exists('my_function')
+    """
+
+    def __init__(self, credentials: dict = None, max_concurrency: int = 10, cache: LookupCache = None,
+                 snapshot: AccountSnapshot = None):
+        """
+        :param credentials: The aws credentials in the form of
+        {
+            "aws_key": <aws access key id>,
+            "aws_secret": <aws_secret_access_key>,
+            "region": <AWS region>
+        }
+        can be None (in which case the default shall be used)
+        :param max_concurrency: Maximum number of lookups running at the same time. Default is 10.
+        :param cache: LookupCache for the role and layer lookups, None skips the cache.
+        :param snapshot: AccountSnapshot to answer from without calling AWS, None calls AWS.
+        """
+        self.credentials = credentials
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.snapshot = snapshot
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Shuts the thread pool down, without waiting for the calls still running on it.
+        """
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, function, *args, **kwargs):
+        # the semaphore is created in the running loop, asyncio primitives are bound to the loop they are used in
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await asyncio.get_event_loop().run_in_executor(self._executor,
+                                                                  functools.partial(function, *args, **kwargs))
+
+    async def check_lambda_exists(self, function_name: str) -> int:
+        """
+        :return: 0 if function does not exist, 1 if it does, -1 when there was an error (see check_lambda_exists)
+        """
+        return await self._run(check_lambda_exists, function_name, self.credentials, snapshot=self.snapshot)
+
+    async def get_iam_role_arn(self, role_name: str) -> str:
+        """
+        :return: string with the ARN of the role, empty string represents an error (see get_iam_role_arn)
+        """
+        return await self._run(get_iam_role_arn, role_name, self.credentials, cache=self.cache,
+                               snapshot=self.snapshot)
+
+    async def get_lambda_layer_latest_version(self, layer_name: str) -> tuple:
+        """
+        :return: Tuple with the layer ARN (empty if there is an error) and the boto3 client (see
+        get_lambda_layer_latest_version)
+        """
+        return await self._run(get_lambda_layer_latest_version, layer_name, self.credentials, cache=self.cache,
+                               snapshot=self.snapshot)
+
+    async def create_json(self, function_name: str, runtime: str, role_name: str, handler: str, description: str,
+                          layer_names: list = None, **kwargs) -> dict:
+        """
+        Resolves the role and the layers at the same time and creates the deployment JSON.
+        :param role_name: The name of the role
+        :param layer_names: List of lambda layer names, can be None or empty.
+        :param kwargs: The other arguments of create_json, eg. timeout, memory_size, tags
+        :return: The JSON (see create_json). An exception naming every layer and role that could not be resolved is
+        raised if any lookup fails.
+        """
+        layer_names = layer_names or []
+        results = await asyncio.gather(self.get_iam_role_arn(role_name),
+                                       *[self.get_lambda_layer_latest_version(layer) for layer in layer_names])
+        role_arn, layer_arns = results[0], [arn for arn, _ in results[1:]]
+        errors = [f'The layer {layer} could not be found' for layer, arn in zip(layer_names, layer_arns) if arn == '']
+        errors += [f'The role {role_name} could not be found'] if role_arn == '' else []
+        if errors:
+            raise Exception('; '.join(errors))
+        return create_json(function_name=function_name, runtime=runtime, role=role_arn, handler=handler,
+                           description=description, lambda_layers=layer_arns, **kwargs)
@@ -0,0 +1,286 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+"""
+
+import os
+import random
+import threading
+import time
+
+try:
+    from src import aws_metrics
+except ImportError:
+    import aws_metrics
+
+_clients = {}
+_clients_lock = threading.Lock()
+_client_factory = None
+
+
+
+def _parse_rate_limit(value: str):
+    """
+    :return: The rate limit in requests per second, None for an empty, 'none', zero or invalid value
+    """
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        return None
+    return rate if rate > 0 else None
+
+
+# fixed client side rate limit, in requests per second per access key and region. None (the default) means calls are
+# only limited once they get throttled, starting at THROTTLED_RATE_LIMIT.
+DEFAULT_RATE_LIMIT = _parse_rate_limit(os.environ.get('DATA_CI_RATE_LIMIT'))
+THROTTLED_RATE_LIMIT = 10.0
+# retries of the throttled calls: attempts, and the exponential backoff (with full jitter) in seconds
+MAX_ATTEMPTS = 6
+BASE_DELAY = 0.25
+MAX_DELAY = 8.0
+THROTTLING_ERROR_CODES = {'Throttling', 'ThrottlingException', 'ThrottledException', 'TooManyRequestsException',
+                          'RequestLimitExceeded', 'RequestThrottled', 'RequestThrottledException',
+                          'ServiceUnavailable', 'ServiceUnavailableException'}
+
+_rate_limit = DEFAULT_RATE_LIMIT
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_client(service: str, credentials: dict = None, max_pool_connections: int = None, max_attempts: int = None,
+               retry_mode: str = None):
+    """
+    Returns a boto3 client for the service, building it only once per service, credentials and configuration.
+    boto3 clients are thread safe, so the same client is shared by every helper (and thread) in the process.
+    :param service: Name of the AWS service, eg. lambda or iam
+    :param credentials: The aws credentials in the form of
+    {
+        "aws_key": <aws access key id>,
+        "aws_secret": <aws_secret_access_key>,
+        "region": <aws region>
+    }
+    can be None (in which case the default shall be used)
+    :param max_pool_connections: Size of the connection pool of the client. None keeps the botocore default (10).
+    :param max_attempts: Total number of attempts botocore makes for a call. Defaults to 1, the helpers retry the
+    throttled calls and the network failures themselves with call_with_retry (under the shared rate limit).
+    :param retry_mode: The botocore retry mode, eg. legacy, standard or adaptive. None keeps the default.
+    :return: The boto3 client
+    """
+    # boto3 and botocore are imported on the first client, they take most of the start up time of the scripts
+    import boto3
+    from botocore.config import Config
+
+    max_attempts = 1 if max_attempts is None else max_attempts
+    key = (service,
+           credentials['aws_key'] if credentials else None,
+           credentials['aws_secret'] if credentials else None,
+           credentials['region'] if credentials else None,
+           max_pool_connections, max_attempts, retry_mode)
+    with _clients_lock:
+        if key not in _clients:
+            config_args = {}
+            if max_pool_connections is not None:
+                config_args['max_pool_connections'] = max_pool_connections
+            retries = {'total_max_attempts': max_attempts}
+            if retry_mode is not None:
+                retries['mode'] = retry_mode
+            config_args['retries'] = retries
+            config = Config(**config_args)
+            start = time.perf_counter()
+            if _client_factory is not None:
+                _clients[key] = _client_factory(service, credentials=credentials, config=config)
+            else:
+                _clients[key] = boto3.client(service, config=config) if not credentials else \
+                    boto3.client(service, aws_access_key_id=credentials['aws_key'],
+                                 aws_secret_access_key=credentials['aws_secret'], region_name=credentials['region'],
+                                 config=config)
+            aws_metrics.record('client', service, time.perf_counter() - start,
+                               region=credentials['region'] if credentials else None)
+        return _clients[key]
+
+
+def credentials_from_args(args) -> dict:
+    """
+    :param args: The parsed command line arguments of a script, with access, secret and region
+    :return: The aws credentials in the form of get_client, None (the default ones) unless both the access and the
+    secret key are given
+    """
+    if args.access is None or args.secret is None:
+        return None
+    return {
+        'aws_key': args.access,
+        'aws_secret': args.secret,
+        'region': args.region
+    }
+
+
+def set_client_factory(factory=None):
+    """
+    Replaces boto3 as the builder of the clients, eg. with an in-process fake backend (see fake_aws). The memoized
+    clients are dropped.
+    :param factory: Callable of the form factory(service, credentials=<credentials dict or None>, config=<botocore
+    Config or None>) returning the client. None restores boto3.
+    """
+    global _client_factory
+    with _clients_lock:
+        _client_factory = factory
+        _clients.clear()
+
+
+def clear_clients():
+    """
+    Drops every memoized client, the next get_client call builds a new one.
+    """
+    with _clients_lock:
+        _clients.clear()
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket. The rate adapts to throttling: it drops by 30% on every throttled call (down to a quarter
+    of its starting rate) and recovers by 5% with every successful one. A bucket without a rate does not limit anything
+    until the first throttled call, then starts at THROTTLED_RATE_LIMIT and stops limiting again once it recovered past
+    four times that.
+    """
+
+    def __init__(self, rate: float = None):
+        """
+        :param rate: Maximum number of requests per second, None to only limit after throttling.
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.tokens = max(rate or 0, 1.0)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available and takes it.
+        """
+        while True:
+            with self._lock:
+                if self.rate is None:
+                    return
+                now = time.monotonic()
+                self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self):
+        with self._lock:
+            if self.rate is None:
+                self.rate = THROTTLED_RATE_LIMIT
+                self.tokens = 0.0
+                self.updated = time.monotonic()
+            else:
+                self.rate = max((self.max_rate or THROTTLED_RATE_LIMIT) / 4, self.rate * 0.7)
+
+    def succeeded(self):
+        with self._lock:
+            if self.rate is None:
+                return
+            self.rate *= 1.05
+            if self.max_rate is not None:
+                self.rate = min(self.max_rate, self.rate)
+            elif self.rate >= 4 * THROTTLED_RATE_LIMIT:
+                self.rate = None
+
+
+def set_rate_limit(rate: float = DEFAULT_RATE_LIMIT):
+    """
+    Changes the client side rate limit shared by every caller of the process.
+    :param rate: Requests per second per access key and region, None to only limit the calls after throttling.
+    """
+    global _rate_limit
+    with _buckets_lock:
+        _rate_limit = rate
+        _buckets.clear()
+
+
+def get_rate_limiter(credentials: dict = None) -> TokenBucket:
+    """
+    :param credentials: The aws credentials (same form as get_client), can be None for the default ones.
+    :return: The TokenBucket shared by every call made with the access key and region
+    """
+    key = (credentials['aws_key'], credentials['region']) if credentials else (None, None)
+    with _buckets_lock:
+        if key not in _buckets:
+            _buckets[key] = TokenBucket(_rate_limit)
+        return _buckets[key]
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """
+    :return: True if the exception is AWS throttling, a temporary unavailability or a server error worth retrying
+    """
+    response = getattr(error, 'response', None) or {}
+    code = response.get('Error', {}).get('Code')
+    if code is not None:
+        return code in THROTTLING_ERROR_CODES or response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500
+    return 'Throttl' in str(error) or 'Rate exceeded' in str(error)
+
+
+def is_connection_error(error: Exception) -> bool:
+    """
+    :return: True if the exception is a network failure (the endpoint could not be reached, the connection was closed
+    or timed out) worth retrying
+    """
+    from botocore.exceptions import ConnectionError, HTTPClientError
+    return isinstance(error, (ConnectionError, HTTPClientError))
+
+
+def call_with_retry(client, operation: str, credentials: dict = None, **kwargs):
+    """
+    Calls client.<operation>(**kwargs) under the shared rate limit of the credentials, retrying the throttled calls
+    and the network failures with exponential backoff and full jitter. Only throttling slows down the rate limit, any
+    other error is raised straight away.
+    :param client: The boto3 client
+    :param operation: Name of the client method, eg. get_function
+    :param credentials: The aws credentials the client was built with (selects the rate limiter), can be None.
+    :param kwargs: The arguments of the call
+    :return: The response of the call
+    """
+    bucket = get_rate_limiter(credentials)
+    start = time.perf_counter()
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        bucket.acquire()
+        try:
+            response = getattr(client, operation)(**kwargs)
+        except Exception as e:
+            throttled = is_throttling_error(e)
+            if attempt == MAX_ATTEMPTS or not (throttled or is_connection_error(e)):
+                error_response = getattr(e, 'response', None) or {}
+                aws_metrics.record('call', operation, time.perf_counter() - start, retries=attempt - 1,
+                                   http_status=error_response.get('ResponseMetadata', {}).get('HTTPStatusCode'),
+                                   error=error_response.get('Error', {}).get('Code') or type(e).__name__)
+                raise
+            if throttled:
+                bucket.throttled()
+            time.sleep(random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** (attempt - 1))))
+        else:
+            bucket.succeeded()
+            aws_metrics.record('call', operation, time.perf_counter() - start, retries=attempt - 1,
+                               http_status=(response.get('ResponseMetadata') or {}).get('HTTPStatusCode')
+                               if isinstance(response, dict) else None)
+            return response
+
+
+def paginate_with_retry(client, operation: str, result_key: str, credentials: dict = None, **kwargs):
+    """
+    Pages through a Marker based list operation (eg. list_functions, list_layers, list_roles) with call_with_retry.
+    :param result_key: Key of the items in the responses, eg. Functions
+    :return: Generator over the items of every page
+    """
+    marker = None
+    while True:
+        page_kwargs = dict(kwargs, Marker=marker) if marker else kwargs
+        response = call_with_retry(client, operation, credentials, **page_kwargs)
+        items = response.get(result_key) or []
+        yield from items
+        marker = response.get('NextMarker') or (response.get('Marker') if response.get('IsTruncated') else None)
+        if not items or not isinstance(marker, str) or not marker:
+            break
@@ -0,0 +1,98 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+"""
+
+import atexit
+import json
+import statistics
+import threading
+import time
+
+_lock = threading.Lock()
+_enabled = False
+_events = []
+_output = None
+
+
+def enable(output_path: str = None, summary_at_exit: bool = True):
+    """
+    Turns on the instrumentation of the AWS client creation, the AWS calls and the lookup cache.
+    :param output_path: File to append every event to as a JSON line, None to only keep them in memory.
+    :param summary_at_exit: Print the summary table when the process exits
+    """
+    global _enabled, _output
+    with _lock:
+        if _output is not None:
+            _output.close()
+        _output = open(output_path, 'a') if output_path else None
+        _enabled = True
+    if summary_at_exit:
+        atexit.register(print_summary)
+
+
+def disable():
+    """
+    Turns the instrumentation off and drops the recorded events.
+    """
+    global _enabled, _output
+    with _lock:
+        if _output is not None:
+            _output.close()
+        _output = None
+        _enabled = False
+        _events.clear()
+    atexit.unregister(print_summary)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def record(event: str, name: str, duration: float = None, **fields):
+    """
+    Records an event, a no-op when the instrumentation is off.
+    :param event: The kind of event: client (client creation), call (AWS call) or cache (lookup cache get)
+    :param name: The service for client events, the operation for call events, the lookup kind for cache events
+    :param duration: Wall time of the event in seconds
+    :param fields: Any other field, eg. retries, http_status, error or hit
+    """
+    if not _enabled:
+        return
+    entry = dict(time=time.time(), event=event, name=name, duration=duration, **fields)
+    with _lock:
+        _events.append(entry)
+        if _output is not None:
+            _output.write(json.dumps(entry) + '\n')
+            _output.flush()
+
+
+def events() -> list:
+    with _lock:
+        return list(_events)
+
+
+def summary() -> str:
+    """
+    :return: Table with the count, errors, retries, cache hits and timings of the events, grouped by event and name
+    """
+    groups = {}
+    for entry in events():
+        groups.setdefault((entry['event'], entry['name']), []).append(entry)
+    lines = [f'{"event":<8}{"name":<28}{"count":>7}{"errors":>8}{"retries":>9}{"hits":>6}'
+             f'{"total s":>10}{"p50 ms":>9}{"max ms":>9}']
+    for (event, name), entries in sorted(groups.items()):
+        durations = [entry['duration'] for entry in entries if entry['duration'] is not None]
+        lines.append(f'{event:<8}{name:<28}{len(entries):>7}'
+                     f'{sum(1 for entry in entries if entry.get("error")):>8}'
+                     f'{sum(entry.get("retries", 0) for entry in entries):>9}'
+                     f'{sum(1 for entry in entries if entry.get("hit")):>6}'
+                     f'{sum(durations):>10.3f}'
+                     f'{(statistics.median(durations) * 1000 if durations else 0):>9.1f}'
+                     f'{(max(durations) * 1000 if durations else 0):>9.1f}')
+    return '\n'.join(lines)
+
+
+def print_summary():
+    if _events:
+        print(f'AWS profile\n{summary()}')
@@ -3,12 +3,25 @@ __author__=sshasan
 __project__=DelosDataPlatform
 """
 
-import boto3
 import argparse
+import json
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
+try:
+    from src import aws_metrics
+    from src.account_snapshot import AccountSnapshot
+    from src.aws_clients import get_client, call_with_retry, paginate_with_retry, credentials_from_args
+    from src.helper_daemon import run_via_daemon
+except ImportError:
+    import aws_metrics
+    from account_snapshot import AccountSnapshot
+    from aws_clients import get_client, call_with_retry, paginate_with_retry, credentials_from_args
+    from helper_daemon import run_via_daemon
 
-def check_lambda_exists(function_name: str, credentials: dict = None) -> int:
+
+def check_lambda_exists(function_name: str, credentials: dict = None, aws_client=None,
+                        snapshot: AccountSnapshot = None) -> int:
     """
     Checks whether a function_name exists as a lambda function
     :param function_name: String with the function name
@@ -18,15 +31,16 @@ def check_lambda_exists(function_name: str, credentials: dict = None) -> int:
         "aws_secret": <aws_secret_access_key>,
         "region": <AWS region>
     }
+    :param aws_client: Boto3 lambda client to use. If None, the shared client for the credentials is used.
+    :param snapshot: AccountSnapshot of the account and region to answer from without calling AWS, None calls AWS.
     :return: 0 if function does not exist, 1 if it does, -1 when there was an error
     """
+    if snapshot is not None:
+        print('Checking the snapshot')
+        return snapshot.function_exists(function_name)
     try:
-        client = boto3.client('lambda') if not credentials else \
-            boto3.client('lambda',
-                         aws_access_key_id=credentials['aws_key'],
-                         aws_secret_access_key=credentials['aws_secret'],
-                         region_name=credentials['region'])
-        response = client.get_function(FunctionName=function_name)
+        client = aws_client if aws_client is not None else get_client('lambda', credentials)
+        response = call_with_retry(client, 'get_function', credentials, FunctionName=function_name)
         if function_name in response['Configuration']['FunctionName']:
             print('Found the function')
             return 1
@@ -42,24 +56,119 @@ def check_lambda_exists(function_name: str, credentials: dict = None) -> int:
             return -1
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--function', help='Name of the function to check', required=True)
+def list_lambda_function_names(credentials: dict = None, aws_client=None) -> set:
+    """
+    Pages through list_functions once and collects every function name in the account/region
+    :param credentials: AWS credentials to use, can be None (uses default). Same form as check_lambda_exists
+    :param aws_client: Boto3 lambda client to use. If None, the shared client for the credentials is used.
+    :return: Set with the names of all the lambda functions
+    """
+    client = aws_client if aws_client is not None else get_client('lambda', credentials)
+    return set(function['FunctionName'] for function in
+               paginate_with_retry(client, 'list_functions', 'Functions', credentials))
+
+
+def check_lambda_exists_batch(function_names: list, credentials: dict = None, max_workers: int = 10,
+                              use_listing: bool = False, snapshot: AccountSnapshot = None) -> dict:
+    """
+    Checks the existence of many lambda functions in one go, sharing a single boto3 client
+    :param function_names: List of function names to check
+    :param credentials: AWS credentials to use, can be None (uses default). Same form as check_lambda_exists
+    :param max_workers: Maximum number of concurrent get_function lookups. Default is 10.
+    :param use_listing: If True, page through list_functions once and test the names against the result instead of
+    calling get_function for every name. Cheaper when checking a large share of the account's functions.
+    :param snapshot: AccountSnapshot of the account and region to answer from without calling AWS, None calls AWS.
+    :return: Dictionary of <function_name>: <result> where the result follows check_lambda_exists (1, 0 or -1)
+    """
+    function_names = list(dict.fromkeys(function_names))
+    if snapshot is not None:
+        print(f'Checking {len(function_names)} functions against the snapshot')
+        return {name: snapshot.function_exists(name) for name in function_names}
+    try:
+        print('Setting up the AWS connection')
+        client = get_client('lambda', credentials, max_pool_connections=max(max_workers, 10))
+        if use_listing:
+            print('Listing all the functions')
+            existing = list_lambda_function_names(credentials, aws_client=client)
+            return {name: 1 if name in existing else 0 for name in function_names}
+    except:
+        print(f'There was an exception. \n{traceback.format_exc()}')
+        return {name: -1 for name in function_names}
+
+    print(f'Checking {len(function_names)} functions')
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda name: check_lambda_exists(name, credentials, aws_client=client), function_names)
+        return dict(zip(function_names, results))
+
+
+def add_arguments(parser: argparse.ArgumentParser, mode: str = None):
+    """
+    Adds the command line arguments
+    :param parser: The parser (or sub parser) to add them to
+    :param mode: single to only take --function, batch to only take --functions/--functions-file, None for either
+    """
+    functions_group = parser.add_mutually_exclusive_group(required=True)
+    if mode != 'batch':
+        functions_group.add_argument('--function', help='Name of the function to check')
+    if mode != 'single':
+        functions_group.add_argument('--functions', help='Names of the functions to check (batch mode), multiple '
+                                                         'names can be entered with spaces', nargs='+')
+        functions_group.add_argument('--functions-file', help='File with one function name per line (batch mode)')
     parser.add_argument('--access', help='AWS Access Key ID', default=None)
     parser.add_argument('--secret', help='AWS Secret Key', default=None)
     parser.add_argument('--region', help='AWS Region', default='us-east-2')
-    parser.add_argument('--output', help='Put output in a file', default='function_exists.txt')
+    parser.add_argument('--output', help='Put output in a file. Defaults to function_exists.txt, or '
+                                         'functions_exist.json in batch mode', default=None)
+    if mode != 'single':
+        parser.add_argument('--workers', help='Number of concurrent lookups in batch mode', type=int, default=10)
+        parser.add_argument('--use-listing', help='In batch mode, list all the functions once instead of one lookup '
+                                                  'per function', action='store_true')
+    parser.add_argument('--snapshot', help='Answer from this account snapshot (see account_snapshot.py) instead of '
+                                           'calling AWS', default=None)
+    parser.add_argument('--profile', help='Print a timing summary of the AWS calls at exit', action='store_true')
+    parser.add_argument('--profile-output', help='Append every AWS call, client creation and cache lookup to this '
+                                                 'file as JSON lines', default=None)
+
+
+def run(args: argparse.Namespace, parser: argparse.ArgumentParser = None):
+    """
+    Runs the check with the parsed command line arguments (see add_arguments)
+    """
+    if args.profile or args.profile_output is not None:
+        aws_metrics.enable(output_path=args.profile_output, summary_at_exit=args.profile)
+
+    aws_credentials = credentials_from_args(args)
 
-    args = parser.parse_args()
+    snapshot = AccountSnapshot.load(args.snapshot) if args.snapshot is not None else None
+    if snapshot is not None:
+        snapshot.check_region(aws_credentials)
+    # the helper daemon (when running) does the AWS calls, unless they are answered locally or profiled
+    use_daemon = snapshot is None and not aws_metrics.is_enabled()
+    if getattr(args, 'function', None) is not None:
+        if use_daemon:
+            exists = run_via_daemon('check_lambda_exists', check_lambda_exists, function_name=args.function,
+                                    credentials=aws_credentials)
+        else:
+            exists = check_lambda_exists(args.function, aws_credentials, snapshot=snapshot)
+        with open(args.output or 'function_exists.txt', 'w') as f:
+            f.write(f'{exists}')
+    else:
+        names = args.functions
+        if args.functions_file is not None:
+            with open(args.functions_file, 'r') as f:
+                names = [line.strip() for line in f if line.strip()]
+        if use_daemon:
+            results = run_via_daemon('check_lambda_exists_batch', check_lambda_exists_batch, function_names=names,
+                                     credentials=aws_credentials, max_workers=args.workers,
+                                     use_listing=args.use_listing)
+        else:
+            results = check_lambda_exists_batch(names, aws_credentials, max_workers=args.workers,
+                                                use_listing=args.use_listing, snapshot=snapshot)
+        with open(args.output or 'functions_exist.json', 'w') as f:
+            json.dump(obj=results, fp=f, indent=4)
 
-    aws_credentials = None
-    if args.access is not None and args.secret is not None:
-        aws_credentials = {
-            'aws_key': args.access,
-            'aws_secret': args.secret,
-            'region': args.region
-        }
 
-    exists = check_lambda_exists(args.function, aws_credentials)
-    with open(args.output, 'w') as f:
-        f.write(f'{exists}')
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    run(parser.parse_args(), parser)
@@ -3,13 +3,31 @@ __author__=sshasan
 __project__=DelosDataPlatform
 """
 
-import boto3
 import argparse
 import json
+import os
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
+try:
+    from src import aws_metrics
+    from src.account_snapshot import AccountSnapshot
+    from src.aws_clients import get_client, call_with_retry, credentials_from_args
+    from src.deployment_diff import detect_changes, save_pending_state, write_change_list, UNCHANGED
+    from src.helper_daemon import run_via_daemon
+    from src.lookup_cache import LookupCache
+except ImportError:
+    import aws_metrics
+    from account_snapshot import AccountSnapshot
+    from aws_clients import get_client, call_with_retry, credentials_from_args
+    from deployment_diff import detect_changes, save_pending_state, write_change_list, UNCHANGED
+    from helper_daemon import run_via_daemon
+    from lookup_cache import LookupCache
 
-def get_iam_role_arn(role_name: str, credentials: dict = None) -> str:
+
+def get_iam_role_arn(role_name: str, credentials: dict = None, cache: LookupCache = None,
+                     snapshot: AccountSnapshot = None) -> str:
     """
     Extracts the ARN of the IAM role specified.
     :param role_name: String with the name of the role
@@ -20,27 +38,38 @@ def get_iam_role_arn(role_name: str, credentials: dict = None) -> str:
         "region": <aws region>
     }
     can be None (in which case the default shall be used)
+    :param cache: LookupCache to answer from (and store into), None skips the cache.
+    :param snapshot: AccountSnapshot to answer from without calling AWS, None (or a miss) does the lookup.
     :return: string with the ARN of the role, empty string represents an error.
     """
     try:
-        print('Setting up the AWS connection')
         if role_name is None or role_name == '':
             raise Exception('Role name not defined')
-        iam = boto3.client('iam') if not credentials else \
-            boto3.client('iam', aws_access_key_id=credentials['aws_key'],
-                         aws_secret_access_key=credentials['aws_secret'], region_name=credentials['region'])
+        if snapshot is not None and snapshot.role_arn(role_name) is not None:
+            print('Returning the ARN from the snapshot')
+            return snapshot.role_arn(role_name)
+        if cache is not None:
+            role_arn = cache.get('role', role_name, credentials)
+            if role_arn is not None:
+                print('Returning the cached ARN')
+                return role_arn
+        print('Setting up the AWS connection')
+        iam = get_client('iam', credentials)
         print('Getting the role')
-        response = iam.get_role(RoleName=role_name)
+        response = call_with_retry(iam, 'get_role', credentials, RoleName=role_name)
         if 'Role' not in response:
             raise Exception('Role was not in the response')
         print('Returning the ARN')
+        if cache is not None:
+            cache.set('role', role_name, response['Role']['Arn'], credentials)
         return response['Role']['Arn']
     except:
         print(f'There was an error in getting the ARN. \n{traceback.format_exc()}')
         return ''
 
 
-def get_lambda_layer_latest_version(layer_name: str, credentials: dict = None, aws_client=None) -> tuple:
+def get_lambda_layer_latest_version(layer_name: str, credentials: dict = None, aws_client=None,
+                                    cache: LookupCache = None, snapshot: AccountSnapshot = None) -> tuple:
     """
     Extracts the latest version of the a lambda layer.
     :param layer_name: Name of the lambda layer to extract latest version from.
@@ -51,23 +80,35 @@ def get_lambda_layer_latest_version(layer_name: str, credentials: dict = None, a
         "region": <AWS region>
     }
     can be None (in which case the default shall be used)
-    :param aws_client: Boto3 client that can be reused. If None, a new client is created.
+    :param aws_client: Boto3 client to use. If None, the shared client for the credentials is used.
+    :param cache: LookupCache to answer from (and store into), None skips the cache.
+    :param snapshot: AccountSnapshot to answer from without calling AWS, None (or a miss) does the lookup.
     :returns Tuple with first element as the layer ARN (empty if there is an error), and the second element the boto3
-    client (None if an error has occured)
+    client (None if an error has occured, or the aws_client given when answered from the snapshot). The client is kept
+    in the tuple for backwards compatibility, the shared client is reused anyway.
     """
     try:
         if layer_name is None or layer_name == '':
             raise Exception('Layer name not present')
 
+        if snapshot is not None and snapshot.layer_arn(layer_name) is not None:
+            print('Returning the layer ARN from the snapshot')
+            return snapshot.layer_arn(layer_name), aws_client
+
         print('Setting up the AWS connection')
         if aws_client is None:
-            aws_client = boto3.client('lambda') if not credentials else \
-                boto3.client('lambda', aws_access_key_id=credentials['aws_key'],
-                             aws_secret_access_key=credentials['aws_secret'], region_name=credentials['region'])
+            aws_client = get_client('lambda', credentials)
+        if cache is not None:
+            version_info = cache.get('layer', layer_name, credentials)
+            if version_info is not None:
+                print('Returning the cached layer ARN')
+                return version_info, aws_client
         print('Getting the layer ARN')
-        response = aws_client.list_layer_versions(LayerName=layer_name, MaxItems=1)
+        response = call_with_retry(aws_client, 'list_layer_versions', credentials, LayerName=layer_name, MaxItems=1)
         if response['ResponseMetadata']['HTTPStatusCode'] == 200:
             version_info = response['LayerVersions'][0]['LayerVersionArn']
+            if cache is not None:
+                cache.set('layer', layer_name, version_info, credentials)
             return version_info, aws_client
         else:
             raise Exception('Status code was not 200.')
@@ -76,6 +117,134 @@ def get_lambda_layer_latest_version(layer_name: str, credentials: dict = None, a
         return '', None
 
 
+def resolve_lookups(layer_names: list, role_names: list, credentials: dict = None, max_workers: int = 10,
+                    cache: LookupCache = None, snapshot: AccountSnapshot = None) -> tuple:
+    """
+    Resolves the latest version ARN of every distinct layer and the ARN of every distinct role at the same time.
+    :param layer_names: List of lambda layer names, can be None or empty. Duplicates are looked up once.
+    :param role_names: List of role names, can be None or empty. Duplicates are looked up once.
+    :param credentials: The aws credentials in the form of
+    {
+        "aws_key": <aws access key id>,
+        "aws_secret": <aws_secret_access_key>,
+        "region": <AWS region>
+    }
+    can be None (in which case the default shall be used)
+    :param max_workers: Maximum number of concurrent lookups. Default is 10.
+    :param cache: LookupCache to answer from (and store into), None skips the cache.
+    :param snapshot: AccountSnapshot to answer from without calling AWS, the layers and roles it misses are looked up.
+    :return: Tuple with the dictionaries <layer_name>: <layer ARN> and <role_name>: <role ARN>. An exception naming
+    every layer and role that could not be resolved is raised if any lookup fails.
+    """
+    layer_names = list(dict.fromkeys(layer_names or []))
+    role_names = list(dict.fromkeys(role_names or []))
+    lambda_client = get_client('lambda', credentials, max_pool_connections=max(max_workers, 10)) \
+        if any(snapshot is None or snapshot.layer_arn(layer) is None for layer in layer_names) else None
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(layer_names) + len(role_names)))) as executor:
+        role_futures = [executor.submit(get_iam_role_arn, role_name=role, credentials=credentials, cache=cache,
+                                        snapshot=snapshot) for role in role_names]
+        layer_futures = [executor.submit(get_lambda_layer_latest_version, layer_name=layer, credentials=credentials,
+                                         aws_client=lambda_client, cache=cache, snapshot=snapshot)
+                         for layer in layer_names]
+        layer_arns = {layer: future.result()[0] for layer, future in zip(layer_names, layer_futures)}
+        role_arns = {role: future.result() for role, future in zip(role_names, role_futures)}
+
+    errors = [f'The layer {layer} could not be found' for layer, arn in layer_arns.items() if arn == '']
+    errors += [f'The role {role} could not be found' for role, arn in role_arns.items() if arn == '']
+    if errors:
+        raise Exception('; '.join(errors))
+    return layer_arns, role_arns
+
+
+def resolve_layers_and_role(layer_names: list, role_name: str, credentials: dict = None,
+                            max_workers: int = 10, cache: LookupCache = None) -> tuple:
+    """
+    Resolves the latest version ARN of every layer and the ARN of the role at the same time.
+    :param layer_names: List of lambda layer names, can be None or empty.
+    :param role_name: String with the name of the role
+    :param credentials: The aws credentials in the form of
+    {
+        "aws_key": <aws access key id>,
+        "aws_secret": <aws_secret_access_key>,
+        "region": <AWS region>
+    }
+    can be None (in which case the default shall be used)
+    :param max_workers: Maximum number of concurrent lookups. Default is 10.
+    :param cache: LookupCache to answer from (and store into), None skips the cache.
+    :return: Tuple with the list of layer ARNs (in the same order as layer_names) and the role ARN. An exception naming
+    every layer (and the role) that could not be resolved is raised if any lookup fails.
+    """
+    layer_names = layer_names or []
+    layer_arns, role_arns = resolve_lookups(layer_names=layer_names, role_names=[role_name], credentials=credentials,
+                                            max_workers=max_workers, cache=cache)
+    return [layer_arns[layer] for layer in layer_names], role_arns[role_name]
+
+
+def region_credentials(credentials: dict, region: str) -> dict:
+    """
+    :param credentials: The aws credentials (same form as the helpers), can be None for the default ones
+    :param region: The AWS region
+    :return: The credentials with the region replaced. The default credentials keep None as the key and secret, so
+    boto3 still resolves them.
+    """
+    return dict(credentials or {'aws_key': None, 'aws_secret': None}, region=region)
+
+
+def resolve_region_lookups(layer_names: list, role_names: list, regions: list, credentials: dict = None,
+                           max_workers: int = 10, cache: LookupCache = None, snapshot: AccountSnapshot = None) -> tuple:
+    """
+    Resolves the latest version ARN of every layer in every region, each region with its own client, and the ARN of
+    every role once since IAM is global. All the regions are resolved at the same time.
+    :param layer_names: List of lambda layer names, can be None or empty. Duplicates are looked up once per region.
+    :param role_names: List of role names, can be None or empty. Duplicates are looked up once.
+    :param regions: List of AWS regions
+    :param credentials: The aws credentials in the form of
+    {
+        "aws_key": <aws access key id>,
+        "aws_secret": <aws_secret_access_key>,
+        "region": <AWS region>
+    }
+    can be None (in which case the default shall be used). The region is replaced by every region of regions.
+    :param max_workers: Maximum number of concurrent lookups per region. Default is 10.
+    :param cache: LookupCache to answer from (and store into), None skips the cache.
+    :param snapshot: AccountSnapshot to answer from, used for the roles and for the layers of its own region.
+    :return: Tuple with the dictionaries <region>: {<layer_name>: <layer ARN>} and <role_name>: <role ARN>. An
+    exception naming every layer and role that could not be resolved (and their region) is raised if any lookup fails.
+    """
+    regions = list(dict.fromkeys(regions))
+    with ThreadPoolExecutor(max_workers=len(regions) + 1) as executor:
+        role_future = executor.submit(resolve_lookups, layer_names=[], role_names=role_names, credentials=credentials,
+                                      max_workers=max_workers, cache=cache, snapshot=snapshot)
+        layer_futures = {region: executor.submit(resolve_lookups, layer_names=layer_names, role_names=[],
+                                                 credentials=region_credentials(credentials, region),
+                                                 max_workers=max_workers, cache=cache,
+                                                 snapshot=snapshot if snapshot is not None and
+                                                 snapshot.region == region else None)
+                         for region in regions}
+        errors = []
+        layer_arns = {}
+        for region, future in layer_futures.items():
+            try:
+                layer_arns[region] = future.result()[0]
+            except Exception as e:
+                errors.append(f'{region}: {e}')
+        try:
+            role_arns = role_future.result()[1]
+        except Exception as e:
+            errors.append(str(e))
+    if errors:
+        raise Exception('; '.join(errors))
+    return layer_arns, role_arns
+
+
+def region_output_path(path: str, region: str) -> str:
+    """
+    :return: The output path of a region, eg. lambda_config.us-east-1.json for lambda_config.json
+    """
+    stem, extension = os.path.splitext(path)
+    return f'{stem}.{region}{extension or ".json"}'
+
+
 def create_json(function_name: str, runtime: str, role: str, handler: str, description: str,
                 timeout: int = 3, memory_size: int = 128, publish: bool = False, lambda_layers: list = None,
                 tags: dict = None, vpc_subnets: list = None, vpc_security_groups: list = None) -> dict:
@@ -136,71 +305,192 @@ def create_json(function_name: str, runtime: str, role: str, handler: str, descr
         return {}
 
 
-if __name__ == "__main__":
-    try:
-        print('Setting up the arguments')
-        parser = argparse.ArgumentParser('Get the latest version number for a lambda layer')
-        # add the arguments
-        parser.add_argument('--function', help='The name of the Lambda function to display', required=True)
-        parser.add_argument('--handler', help='The handler within the function that executes. '
-                                              'Should be of the format <module_name>.<handler>', required=True)
-        parser.add_argument('--runtime', help='The runtime for the function eg. python3.7', required=True)
-        parser.add_argument('--role', help='The name of the role', required=True)
-        parser.add_argument('--description', help='The description for the lambda function', default=None)
-        parser.add_argument('--timeout', help='The timeout value in seconds. Default is 3.', type=int, default=3)
-        parser.add_argument('--memory', help='The memory size for the lambda function', type=int, default=128)
-        parser.add_argument('--publish', help='Do we want to publish a new version? Default is False.', type=bool,
-                            default=False)
-        parser.add_argument('--layers', help='Layer name(s), multiple names can be entered with spaces', nargs='+',
-                            required=True)
-        parser.add_argument('--vpc-subnets', help='VPC subnets to associate with the Lambda', nargs='+')
-        parser.add_argument('--vpc-security-groups', help='VPC security groups to associate with the Lambda',
-                            nargs='+')
-        parser.add_argument('--tags', help='JSON file with tags', default=None)
-        parser.add_argument('--access', help='AWS access key', default=None)
-        parser.add_argument('--secret', help='AWS secret key', default=None)
-        parser.add_argument('--region', help='AWS Region', default='us-east-2')
-        parser.add_argument('--output', help='Create the output JSON for update-function-configuration', required=True)
+def add_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the command line arguments
+    :param parser: The parser (or sub parser) to add them to
+    """
+    parser.add_argument('--function', help='The name of the Lambda function to display')
+    parser.add_argument('--handler', help='The handler within the function that executes. '
+                                          'Should be of the format <module_name>.<handler>')
+    parser.add_argument('--runtime', help='The runtime for the function eg. python3.7')
+    role_group = parser.add_mutually_exclusive_group()
+    role_group.add_argument('--role', help='The name of the role')
+    role_group.add_argument('--role-arn', help='The ARN of the role, skips the IAM lookup', default=None)
+    parser.add_argument('--description', help='The description for the lambda function', default=None)
+    parser.add_argument('--timeout', help='The timeout value in seconds. Default is 3.', type=int, default=3)
+    parser.add_argument('--memory', help='The memory size for the lambda function', type=int, default=128)
+    parser.add_argument('--publish', help='Do we want to publish a new version? Default is False.', type=bool,
+                        default=False)
+    layers_group = parser.add_mutually_exclusive_group()
+    layers_group.add_argument('--layers', help='Layer name(s), multiple names can be entered with spaces', nargs='+')
+    layers_group.add_argument('--layer-arns', help='Layer version ARN(s), skips the layer lookups', nargs='+',
+                              default=None)
+    parser.add_argument('--vpc-subnets', help='VPC subnets to associate with the Lambda', nargs='+')
+    parser.add_argument('--vpc-security-groups', help='VPC security groups to associate with the Lambda',
+                        nargs='+')
+    parser.add_argument('--tags', help='JSON file with tags', default=None)
+    parser.add_argument('--access', help='AWS access key', default=None)
+    parser.add_argument('--secret', help='AWS secret key', default=None)
+    parser.add_argument('--region', help='AWS Region', default='us-east-2')
+    parser.add_argument('--regions', help='Create the JSON for each of these regions at once, written to '
+                                          '<output stem>.<region>.json. The role is looked up once, the layers in '
+                                          'every region', nargs='+', default=None)
+    parser.add_argument('--output', help='Create the output JSON for update-function-configuration')
+    parser.add_argument('--manifest', help='JSON or YAML manifest with many functions. Replaces the single '
+                                           'function arguments (--function, --handler, --runtime, --role, '
+                                           '--role-arn, --layers, --layer-arns, --output)', default=None)
+    parser.add_argument('--output-dir', help='Directory for the JSON files of a manifest that do not set their '
+                                             'own output', default='.')
+    parser.add_argument('--workers', help='Number of concurrent AWS lookups', type=int, default=10)
+    parser.add_argument('--state-file', help='JSON file with the hashes of the configurations of the last deploy, '
+                                             'used to detect the changed functions. The new hashes are written to '
+                                             '<state-file>.pending, promote them after the deploy with '
+                                             'deployment_diff.py --commit-state <state-file>', default=None)
+    parser.add_argument('--compare-live', help='Detect the changed functions by comparing with their live '
+                                               'configuration', action='store_true')
+    parser.add_argument('--changed-only', help='Only write the JSON of the functions that changed, needs '
+                                               '--state-file or --compare-live', action='store_true')
+    parser.add_argument('--changes-output', help='Write the list of changed functions to this JSON file',
+                        default=None)
+    parser.add_argument('--cache', help='Use the local cache for the role and layer ARN lookups',
+                        action='store_true')
+    parser.add_argument('--cache-dir', help='Directory of the local lookup cache, implies --cache', default=None)
+    parser.add_argument('--refresh', help='Ignore the cached lookups but store the fresh ones, implies --cache',
+                        action='store_true')
+    parser.add_argument('--snapshot', help='Resolve the layers and roles from this account snapshot (see '
+                                           'account_snapshot.py), the ones it misses are looked up', default=None)
 
-        print('Parsing the arguments')
-        args = parser.parse_args()
-
-        print('Checking the ')
-        aws_credentials = None
-        if args.access is not None and args.secret is not None:
-            aws_credentials = {
-                'aws_key': args.access,
-                'aws_secret': args.secret,
-                'region': args.region
-            }
+    parser.add_argument('--profile', help='Print a timing summary of the AWS calls at exit', action='store_true')
+    parser.add_argument('--profile-output', help='Append every AWS call, client creation and cache lookup to '
+                                                 'this file as JSON lines', default=None)
+
+
+def run(args: argparse.Namespace, parser: argparse.ArgumentParser):
+    """
+    Creates the deployment JSON (or the JSON files of a manifest) with the parsed command line arguments (see
+    add_arguments)
+    :param args: The parsed arguments
+    :param parser: The parser, used to report the invalid combinations of arguments
+    """
+    if args.profile or args.profile_output is not None:
+        aws_metrics.enable(output_path=args.profile_output, summary_at_exit=args.profile)
+    if args.manifest is None:
+        missing = [f'--{name}' for name in ['function', 'handler', 'runtime', 'output'] if getattr(args, name) is None]
+        if args.role is None and args.role_arn is None:
+            missing.append('--role or --role-arn')
+        if args.layers is None and args.layer_arns is None:
+            missing.append('--layers or --layer-arns')
+        if missing:
+            parser.error(f'the following arguments are required: {", ".join(missing)}')
+    if (args.changed_only or args.changes_output) and args.state_file is None and not args.compare_live:
+        parser.error('--changed-only and --changes-output need --state-file or --compare-live')
+    if args.regions is not None:
+        if args.manifest is not None or args.layer_arns is not None:
+            parser.error('--regions can not be combined with --manifest or --layer-arns')
+        if args.state_file is not None or args.compare_live or args.changed_only or args.changes_output:
+            parser.error('--regions can not be combined with the change detection arguments')
+
+    print('Checking the ')
+    aws_credentials = credentials_from_args(args)
 
+    lookup_cache = None
+    if args.cache or args.cache_dir is not None or args.refresh:
+        lookup_cache = LookupCache(cache_dir=args.cache_dir, refresh=args.refresh)
+    snapshot = AccountSnapshot.load(args.snapshot) if args.snapshot is not None else None
+    if snapshot is not None and args.regions is None:
+        # with --regions the snapshot only answers for its own region (see resolve_region_lookups)
+        snapshot.check_region(aws_credentials)
+    # the helper daemon (when running) does the lookups, unless they are answered from a snapshot or profiled. Its
+    # cache only stands in for a plain --cache, the lookups of the other callers are always fresh.
+    use_daemon = snapshot is None and args.cache_dir is None and not args.refresh and not aws_metrics.is_enabled()
+    if args.manifest is not None:
+        try:
+            from src.deployment_manifest import load_manifest, build_manifest
+        except ImportError:
+            from deployment_manifest import load_manifest, build_manifest
+        print('Building the manifest')
+        build_manifest(manifest=load_manifest(args.manifest), credentials=aws_credentials,
+                       output_dir=args.output_dir, max_workers=args.workers, cache=lookup_cache,
+                       changed_only=args.changed_only, state_file=args.state_file,
+                       compare_live=args.compare_live, changes_output=args.changes_output, snapshot=snapshot)
+    else:
         print('making checks for tags')
         tags = None
         if args.tags is not None:
             with open(args.tags, 'r') as f:
                 tags = json.load(f)
 
-        print('making checks for layers')
-        if args.layers is not None:
-            layers = []
-            client = None
-            for layer in args.layers:
-                layer_arn, client = get_lambda_layer_latest_version(layer_name=layer, credentials=aws_credentials,
-                                                                    aws_client=client)
-                if layer_arn is not '':
-                    layers.append(layer_arn)
+        if args.regions is not None:
+            print(f'Getting the layer ARNs in {len(args.regions)} regions and the role ARN')
+            lookup_args = dict(layer_names=args.layers, role_names=[args.role] if args.role_arn is None else [],
+                               regions=args.regions, credentials=aws_credentials, max_workers=args.workers)
+            if use_daemon:
+                layer_arns, role_arns = run_via_daemon('resolve_region_lookups',
+                                                       partial(resolve_region_lookups, cache=lookup_cache),
+                                                       use_cache=lookup_cache is not None, **lookup_args)
+            else:
+                layer_arns, role_arns = resolve_region_lookups(cache=lookup_cache, snapshot=snapshot, **lookup_args)
+            role_arn = args.role_arn if args.role_arn is not None else role_arns[args.role]
+            for region in args.regions:
+                print(f'Creating the JSON for {region}')
+                json_file = create_json(function_name=args.function, runtime=args.runtime, role=role_arn,
+                                        handler=args.handler, description=args.description, timeout=args.timeout,
+                                        memory_size=args.memory, publish=args.publish,
+                                        lambda_layers=[layer_arns[region][layer] for layer in args.layers],
+                                        tags=tags, vpc_subnets=args.vpc_subnets,
+                                        vpc_security_groups=args.vpc_security_groups)
+                output = region_output_path(args.output, region)
+                print(f'Writing the JSON file {output}')
+                with open(output, 'w') as f:
+                    json.dump(obj=json_file, fp=f)
+        else:
+            print('Getting the layer and role ARNs')
+            layers, role_arn = args.layer_arns, args.role_arn
+            if layers is None or role_arn is None:
+                lookup_args = dict(layer_names=args.layers if layers is None else [],
+                                   role_names=[args.role] if role_arn is None else [], credentials=aws_credentials,
+                                   max_workers=args.workers)
+                if use_daemon:
+                    layer_arns, role_arns = run_via_daemon('resolve_lookups',
+                                                           partial(resolve_lookups, cache=lookup_cache),
+                                                           use_cache=lookup_cache is not None, **lookup_args)
                 else:
-                    raise Exception(f'The layer {layer} could not be found')
-        print('Getting the role ARN')
-        role_arn = get_iam_role_arn(role_name=args.role, credentials=aws_credentials)
-        print('Creating the JSON')
-        json_file = create_json(function_name=args.function, runtime=args.runtime, role=role_arn, handler=args.handler,
-                                description=args.description, timeout=args.timeout, memory_size=args.memory,
-                                publish=args.publish, lambda_layers=layers, tags=tags, vpc_subnets=args.vpc_subnets,
-                                vpc_security_groups=args.vpc_security_groups)
-        print(f'Writing the JSON file: \n{json.dumps(json_file, indent=4)}')
-        with open(args.output, 'w') as f:
-            json.dump(obj=json_file, fp=f)
+                    layer_arns, role_arns = resolve_lookups(cache=lookup_cache, snapshot=snapshot, **lookup_args)
+                layers = layers if layers is not None else [layer_arns[layer] for layer in args.layers]
+                role_arn = role_arn if role_arn is not None else role_arns[args.role]
+            print('Creating the JSON')
+            json_file = create_json(function_name=args.function, runtime=args.runtime, role=role_arn,
+                                    handler=args.handler, description=args.description, timeout=args.timeout,
+                                    memory_size=args.memory, publish=args.publish, lambda_layers=layers, tags=tags,
+                                    vpc_subnets=args.vpc_subnets, vpc_security_groups=args.vpc_security_groups)
+            changes = {args.function: None}
+            if args.state_file is not None or args.compare_live:
+                print('Detecting the changes')
+                changes = detect_changes({args.function: json_file}, state_file=args.state_file,
+                                         compare_live=args.compare_live, credentials=aws_credentials)
+                print(f'The configuration is {changes[args.function]}')
+                if args.changes_output is not None:
+                    write_change_list(args.changes_output, changes)
+            if args.changed_only and changes[args.function] == UNCHANGED:
+                print('Skipping the unchanged JSON file')
+            else:
+                print(f'Writing the JSON file: \n{json.dumps(json_file, indent=4)}')
+                with open(args.output, 'w') as f:
+                    json.dump(obj=json_file, fp=f)
+                if args.state_file is not None:
+                    save_pending_state(args.state_file, {args.function: json_file})
+
+
+if __name__ == "__main__":
+    try:
+        print('Setting up the arguments')
+        parser = argparse.ArgumentParser('Get the latest version number for a lambda layer')
+        add_arguments(parser)
+        print('Parsing the arguments')
+        run(parser.parse_args(), parser)
         print('Done')
+    except SystemExit:
+        raise
     except:
         print(f'There was an error in the process. \n{traceback.format_exc()}')
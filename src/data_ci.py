@@ -0,0 +1,80 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+"""
+
+import argparse
+import sys
+import traceback
+
+try:
+    from src import account_snapshot, check_lambda_function_exists, create_lambda_deployment_json, lambda_apply, \
+        package_builder
+except ImportError:
+    import account_snapshot
+    import check_lambda_function_exists
+    import create_lambda_deployment_json
+    import lambda_apply
+    import package_builder
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the parser with one sub command per script. Nothing here imports boto3, it is only loaded by the first AWS
+    client a command creates.
+    :return: The argument parser
+    """
+    parser = argparse.ArgumentParser('data_ci', description='Data CI utilities')
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    exists_parser = subparsers.add_parser('exists', help='Check whether a lambda function exists')
+    check_lambda_function_exists.add_arguments(exists_parser, mode='single')
+    exists_parser.set_defaults(run=check_lambda_function_exists.run)
+
+    batch_parser = subparsers.add_parser('batch', help='Check whether many lambda functions exist')
+    check_lambda_function_exists.add_arguments(batch_parser, mode='batch')
+    batch_parser.set_defaults(run=check_lambda_function_exists.run)
+
+    deployment_parser = subparsers.add_parser('deployment-json', help='Create the deployment JSON of a lambda '
+                                                                      'function, or of every function of a manifest')
+    create_lambda_deployment_json.add_arguments(deployment_parser)
+    deployment_parser.set_defaults(run=create_lambda_deployment_json.run)
+
+    snapshot_parser = subparsers.add_parser('snapshot', help='Save an index of the lambda functions, layers and roles '
+                                                             'of an account, for the --snapshot option')
+    account_snapshot.add_arguments(snapshot_parser)
+    snapshot_parser.set_defaults(run=account_snapshot.run)
+
+    apply_parser = subparsers.add_parser('apply', help='Create or update lambda functions from their deployment '
+                                                       'JSONs')
+    lambda_apply.add_arguments(apply_parser)
+    apply_parser.set_defaults(run=lambda_apply.run)
+
+    package_parser = subparsers.add_parser('package', help='Build the deployment package of a lambda function and '
+                                                           'fill the Code section of its deployment JSONs')
+    package_builder.add_arguments(package_parser)
+    package_parser.set_defaults(run=package_builder.run)
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """
+    Runs a sub command
+    :param argv: The command line arguments, None reads them from sys.argv
+    :return: The exit code, 0 on success and 1 if the command failed
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        args.run(args, parser)
+        return 0
+    except SystemExit:
+        raise
+    except:
+        print(f'There was an error in the process. \n{traceback.format_exc()}')
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
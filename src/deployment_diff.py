@@ -0,0 +1,213 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from src.aws_clients import get_client, call_with_retry
+except ImportError:
+    from aws_clients import get_client, call_with_retry
+
+NEW = 'new'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+
+
+def payload_hash(payload: dict) -> str:
+    """
+    :param payload: Deployment JSON created by create_json
+    :return: Hex SHA-256 of the payload, independent of the key order
+    """
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_state(path: str) -> dict:
+    """
+    :param path: Path of the state file written by save_state
+    :return: Dictionary of <function_name>: <payload hash>, empty if the file does not exist
+    """
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_state(path: str, payloads: dict):
+    """
+    Records the hash of every payload, merged with the hashes of the functions already in the state file.
+    :param path: Path of the state file
+    :param payloads: Dictionary of <function_name>: <deployment JSON>
+    """
+    state = load_state(path)
+    state.update({function_name: payload_hash(payload) for function_name, payload in payloads.items()})
+    with open(path, 'w') as f:
+        json.dump(obj=state, fp=f, indent=4, sort_keys=True)
+
+
+def pending_state_path(path: str) -> str:
+    """
+    :param path: Path of the state file
+    :return: Path of the pending state file next to it
+    """
+    return f'{path}.pending'
+
+
+def save_pending_state(path: str, payloads: dict):
+    """
+    Records the hash of every payload in the pending state file, not in the state file itself. The hashes only count
+    as deployed once commit_state promotes them, so a failed deploy is detected as changed again on the next run.
+    :param path: Path of the state file
+    :param payloads: Dictionary of <function_name>: <deployment JSON>
+    """
+    save_state(pending_state_path(path), payloads)
+
+
+def commit_state(path: str, function_names: list = None) -> list:
+    """
+    Promotes the pending hashes into the state file, to be run after the deploy succeeded.
+    :param path: Path of the state file
+    :param function_names: Only promote these functions (eg. the ones whose deploy succeeded), None promotes all.
+    The other pending hashes stay pending.
+    :return: List with the names of the promoted functions
+    """
+    pending = load_state(pending_state_path(path))
+    names = list(pending) if function_names is None else [name for name in function_names if name in pending]
+    state = load_state(path)
+    state.update({name: pending.pop(name) for name in names})
+    with open(path, 'w') as f:
+        json.dump(obj=state, fp=f, indent=4, sort_keys=True)
+    if pending:
+        with open(pending_state_path(path), 'w') as f:
+            json.dump(obj=pending, fp=f, indent=4, sort_keys=True)
+    elif os.path.exists(pending_state_path(path)):
+        os.remove(pending_state_path(path))
+    return names
+
+
+def _comparable_payload(payload: dict) -> dict:
+    return {
+        'Runtime': payload.get('Runtime'),
+        'Role': payload.get('Role'),
+        'Handler': payload.get('Handler'),
+        'Description': payload.get('Description'),
+        'Timeout': payload.get('Timeout'),
+        'MemorySize': payload.get('MemorySize'),
+        'Layers': list(payload.get('Layers') or []),
+        'SubnetIds': sorted(payload.get('VpcConfig', {}).get('SubnetIds') or []),
+        'SecurityGroupIds': sorted(payload.get('VpcConfig', {}).get('SecurityGroupIds') or []),
+        'Tags': payload.get('Tags') or {}
+    }
+
+
+def _comparable_live(response: dict) -> dict:
+    configuration = response['Configuration']
+    vpc_config = configuration.get('VpcConfig') or {}
+    return {
+        'Runtime': configuration.get('Runtime'),
+        'Role': configuration.get('Role'),
+        'Handler': configuration.get('Handler'),
+        'Description': configuration.get('Description'),
+        'Timeout': configuration.get('Timeout'),
+        'MemorySize': configuration.get('MemorySize'),
+        'Layers': [layer['Arn'] for layer in configuration.get('Layers') or []],
+        'SubnetIds': sorted(vpc_config.get('SubnetIds') or []),
+        'SecurityGroupIds': sorted(vpc_config.get('SecurityGroupIds') or []),
+        # tags under the aws: prefix are added by AWS itself
+        'Tags': {key: value for key, value in (response.get('Tags') or {}).items() if not key.startswith('aws:')}
+    }
+
+
+def compare_with_live(payload: dict, credentials: dict = None, aws_client=None) -> str:
+    """
+    Compares a deployment JSON with the live configuration of the function.
+    :param payload: Deployment JSON created by create_json
+    :param credentials: The aws credentials in the form of
+    {
+        "aws_key": <aws access key id>,
+        "aws_secret": <aws_secret_access_key>,
+        "region": <AWS region>
+    }
+    can be None (in which case the default shall be used)
+    :param aws_client: Boto3 lambda client to use. If None, the shared client for the credentials is used.
+    :return: NEW if the function does not exist, UNCHANGED if the configuration matches, CHANGED otherwise (including
+    when the live configuration could not be read)
+    """
+    try:
+        client = aws_client if aws_client is not None else get_client('lambda', credentials)
+        response = call_with_retry(client, 'get_function', credentials, FunctionName=payload['FunctionName'])
+        return UNCHANGED if _comparable_payload(payload) == _comparable_live(response) else CHANGED
+    except Exception as e:
+        if 'ResourceNotFound' in str(e):
+            return NEW
+        print(f'Could not read the live configuration, treating it as changed. \n{traceback.format_exc()}')
+        return CHANGED
+
+
+def detect_changes(payloads: dict, state_file: str = None, compare_live: bool = False, credentials: dict = None,
+                   max_workers: int = 10) -> dict:
+    """
+    Finds the functions whose deployment JSON changed, either since the last run (hashes in the state file) or
+    compared with the live configuration of the functions.
+    :param payloads: Dictionary of <function_name>: <deployment JSON>
+    :param state_file: Path of the state file with the hashes of the last run. Used when compare_live is False.
+    :param compare_live: If True, compare with the live configurations (one get_function per function, concurrently)
+    :param credentials: The aws credentials, same form as compare_with_live. Only used with compare_live.
+    :param max_workers: Maximum number of concurrent get_function calls. Default is 10.
+    :return: Dictionary of <function_name>: <NEW, CHANGED or UNCHANGED>
+    """
+    if compare_live:
+        client = get_client('lambda', credentials, max_pool_connections=max(max_workers, 10))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            statuses = executor.map(lambda payload: compare_with_live(payload, credentials, aws_client=client),
+                                    payloads.values())
+            return dict(zip(payloads.keys(), statuses))
+
+    state = load_state(state_file)
+    changes = {}
+    for function_name, payload in payloads.items():
+        if function_name not in state:
+            changes[function_name] = NEW
+        elif state[function_name] == payload_hash(payload):
+            changes[function_name] = UNCHANGED
+        else:
+            changes[function_name] = CHANGED
+    return changes
+
+
+def write_change_list(path: str, changes: dict):
+    """
+    Writes the machine readable change list:
+    {
+        "changed": [<names of the new and changed functions>],
+        "unchanged": [<names of the unchanged functions>],
+        "functions": {<function_name>: <NEW, CHANGED or UNCHANGED>}
+    }
+    :param path: Path of the output file
+    :param changes: Dictionary returned by detect_changes
+    """
+    with open(path, 'w') as f:
+        json.dump(obj={
+            'changed': [name for name, status in changes.items() if status != UNCHANGED],
+            'unchanged': [name for name, status in changes.items() if status == UNCHANGED],
+            'functions': changes
+        }, fp=f, indent=4)
+
+
+if __name__ == "__main__":
+    try:
+        parser = argparse.ArgumentParser('Promote the pending deployment JSON hashes after a successful deploy')
+        parser.add_argument('--commit-state', help='The state file to promote the pending hashes into', required=True)
+        parser.add_argument('--functions', help='Only promote these functions, all of them by default', nargs='+')
+        args = parser.parse_args()
+
+        promoted = commit_state(args.commit_state, args.functions)
+        print(f'Promoted {len(promoted)} functions into {args.commit_state}')
+    except:
+        print(f'There was an error in the process. \n{traceback.format_exc()}')
@@ -0,0 +1,183 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+"""
+
+import json
+import os
+import time
+
+try:
+    from src.account_snapshot import AccountSnapshot
+    from src.create_lambda_deployment_json import create_json, resolve_lookups
+    from src.deployment_diff import detect_changes, save_pending_state, write_change_list, UNCHANGED
+    from src.lookup_cache import LookupCache
+except ImportError:
+    from account_snapshot import AccountSnapshot
+    from create_lambda_deployment_json import create_json, resolve_lookups
+    from deployment_diff import detect_changes, save_pending_state, write_change_list, UNCHANGED
+    from lookup_cache import LookupCache
+
+# keys of a function spec, with the defaults used when neither the function nor the manifest defaults set them
+SPEC_DEFAULTS = {
+    'function': None,
+    'handler': None,
+    'runtime': None,
+    'role': None,
+    'description': None,
+    'timeout': 3,
+    'memory': 128,
+    'publish': False,
+    'layers': None,
+    'vpc_subnets': None,
+    'vpc_security_groups': None,
+    'tags': None,
+    'output': None
+}
+REQUIRED_KEYS = ['function', 'handler', 'runtime', 'role']
+
+
+def load_manifest(path: str) -> dict:
+    """
+    Loads a manifest file. YAML manifests (.yaml/.yml) need PyYAML, every other file is read as JSON.
+    The manifest is of the form
+    {
+        "defaults": {<key>: <value shared by every function>},
+        "functions": [{"function": <function name>, "handler": <module_name>.<handler>, ...}]
+    }
+    where the keys are the ones of SPEC_DEFAULTS (the argument names of create_lambda_deployment_json.py).
+    :param path: Path to the manifest file
+    :return: Dictionary with the manifest
+    """
+    with open(path, 'r') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise Exception('PyYAML is required for YAML manifests, install it with pip install pyyaml')
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def expand_manifest(manifest: dict) -> list:
+    """
+    Merges the manifest defaults into every function spec. Tags are merged key by key, every other key of the
+    function replaces the default.
+    :param manifest: Dictionary with the manifest (see load_manifest)
+    :return: List of complete function specs, in the order of the manifest. An exception listing every problem is
+    raised if a spec is invalid.
+    """
+    defaults = manifest.get('defaults') or {}
+    specs = []
+    errors = []
+    for position, function in enumerate(manifest.get('functions') or []):
+        spec = dict(SPEC_DEFAULTS, **defaults)
+        spec.update(function)
+        if defaults.get('tags') and function.get('tags'):
+            spec['tags'] = dict(defaults['tags'], **function['tags'])
+        name = spec['function'] or f'#{position}'
+        unknown = sorted(set(spec) - set(SPEC_DEFAULTS))
+        if unknown:
+            errors.append(f'Function {name} has unknown keys: {", ".join(unknown)}')
+        missing = [key for key in REQUIRED_KEYS if spec[key] is None]
+        if missing:
+            errors.append(f'Function {name} is missing: {", ".join(missing)}')
+        specs.append(spec)
+    if not specs:
+        errors.append('The manifest does not have any functions')
+    names = [spec['function'] for spec in specs]
+    duplicates = sorted(set(name for name in names if name is not None and names.count(name) > 1))
+    if duplicates:
+        errors.append(f'Functions defined more than once: {", ".join(duplicates)}')
+    if errors:
+        raise Exception('; '.join(errors))
+    return specs
+
+
+def build_manifest(manifest: dict, credentials: dict = None, output_dir: str = '.', max_workers: int = 10,
+                   cache: LookupCache = None, changed_only: bool = False, state_file: str = None,
+                   compare_live: bool = False, changes_output: str = None, snapshot: AccountSnapshot = None) -> dict:
+    """
+    Creates the deployment JSON of every function of the manifest. Every distinct layer and role is looked up once,
+    all of them at the same time, and the JSON files are written in one pass.
+    :param manifest: Dictionary with the manifest (see load_manifest)
+    :param credentials: The aws credentials in the form of
+    {
+        "aws_key": <aws access key id>,
+        "aws_secret": <aws_secret_access_key>,
+        "region": <AWS region>
+    }
+    can be None (in which case the default shall be used)
+    :param output_dir: Directory for the JSON files of the functions that do not set an output, named
+    <function_name>.json
+    :param max_workers: Maximum number of concurrent lookups. Default is 10.
+    :param cache: LookupCache to answer from (and store into), None skips the cache.
+    :param changed_only: If True, only write the JSON files of the functions that changed (see detect_changes)
+    :param state_file: Path of the state file with the payload hashes of the last deploy. The hashes of the written
+    files go to the pending state file, promote them with deployment_diff.commit_state after the deploy succeeded.
+    :param compare_live: If True, detect the changes against the live configurations instead of the state file.
+    :param changes_output: Path to write the change list to (see write_change_list), None to not write it.
+    :param snapshot: AccountSnapshot to resolve the layers and roles from, the ones it misses are looked up.
+    :return: Dictionary of <function_name>: <deployment JSON> for every JSON file that was written
+    """
+    start = time.perf_counter()
+    specs = expand_manifest(manifest)
+    function_count = len(specs)
+
+    print('Resolving the layers and roles')
+    lookup_start = time.perf_counter()
+    layer_names = [layer for spec in specs for layer in spec['layers'] or []]
+    role_names = [spec['role'] for spec in specs]
+    layer_arns, role_arns = resolve_lookups(layer_names=layer_names, role_names=role_names, credentials=credentials,
+                                            max_workers=max_workers, cache=cache, snapshot=snapshot)
+    lookup_time = time.perf_counter() - lookup_start
+
+    print('Creating the JSONs')
+    create_start = time.perf_counter()
+    payloads = {}
+    for spec in specs:
+        payload = create_json(function_name=spec['function'], runtime=spec['runtime'], role=role_arns[spec['role']],
+                              handler=spec['handler'], description=spec['description'], timeout=spec['timeout'],
+                              memory_size=spec['memory'], publish=spec['publish'],
+                              lambda_layers=[layer_arns[layer] for layer in spec['layers'] or []], tags=spec['tags'],
+                              vpc_subnets=spec['vpc_subnets'], vpc_security_groups=spec['vpc_security_groups'])
+        if not payload:
+            raise Exception(f'The JSON for the function {spec["function"]} could not be created')
+        payloads[spec['function']] = payload
+    create_time = time.perf_counter() - create_start
+
+    diff_start = time.perf_counter()
+    changes = None
+    if state_file is not None or compare_live:
+        print('Detecting the changes')
+        changes = detect_changes(payloads, state_file=state_file, compare_live=compare_live, credentials=credentials,
+                                 max_workers=max_workers)
+        if changes_output is not None:
+            write_change_list(changes_output, changes)
+        if changed_only:
+            specs = [spec for spec in specs if changes[spec['function']] != UNCHANGED]
+            payloads = {spec['function']: payloads[spec['function']] for spec in specs}
+    diff_time = time.perf_counter() - diff_start
+
+    print('Writing the JSON files')
+    write_start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    for spec in specs:
+        output = spec['output'] or os.path.join(output_dir, f'{spec["function"]}.json')
+        with open(output, 'w') as f:
+            json.dump(obj=payloads[spec['function']], fp=f)
+    if state_file is not None:
+        save_pending_state(state_file, payloads)
+    write_time = time.perf_counter() - write_start
+
+    print(f'Timing summary\n'
+          f'    functions:        {function_count}\n'
+          f'    written:          {len(specs)}\n'
+          f'    distinct layers:  {len(layer_arns)}\n'
+          f'    distinct roles:   {len(role_arns)}\n'
+          f'    lookups:          {lookup_time:.3f}s\n'
+          f'    JSON creation:    {create_time:.3f}s\n'
+          f'    change detection: {diff_time:.3f}s\n'
+          f'    writing:          {write_time:.3f}s\n'
+          f'    total:            {time.perf_counter() - start:.3f}s')
+    return payloads
@@ -0,0 +1,333 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+"""
+
+import base64
+import hashlib
+import random
+import threading
+import time
+from collections import Counter
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+try:
+    from src.aws_clients import set_client_factory
+except ImportError:
+    from aws_clients import set_client_factory
+
+DEFAULT_REGION = 'us-east-2'
+DEFAULT_ACCOUNT_ID = '123456789012'
+
+
+def _client_error(code: str, message: str, operation_name: str, status_code: int) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': message},
+                        'ResponseMetadata': {'HTTPStatusCode': status_code}}, operation_name)
+
+
+class FakeAWSBackend:
+    """
+    In-process fake of the Lambda and IAM calls made by the utilities, with configurable latency and throttling.
+    Installing it (see install, or use it as a context manager) makes aws_clients.get_client return fake clients, so
+    every helper runs against it unchanged. Errors are botocore ClientErrors with the same codes as AWS.
+    """
+
+    def __init__(self, latency=0.0, throttle_rate: float = 0.0, seed: int = None,
+                 account_id: str = DEFAULT_ACCOUNT_ID, default_region: str = DEFAULT_REGION, pending_polls: int = 1):
+        """
+        :param latency: Seconds every call takes, either a float or a dictionary of <operation name>: <seconds>
+        (eg. {"GetFunction": 0.05}) where missing operations take no time.
+        :param throttle_rate: Probability (0 to 1) of a call failing with a ThrottlingException
+        :param seed: Seed of the random generator deciding the throttling, for reproducible runs
+        :param account_id: The account id used in the ARNs
+        :param default_region: Region of the clients built without credentials
+        :param pending_polls: Number of get_function_configuration calls a created or updated function stays Pending
+        or InProgress for
+        """
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.account_id = account_id
+        self.default_region = default_region
+        self.pending_polls = pending_polls
+        self.failing_functions = set()
+        # number of the next calls of an operation failing to connect, eg. {"GetFunction": 2}
+        self.connection_failures = Counter()
+        self.call_counts = Counter()
+        self.throttle_counts = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._functions = {}
+        self._layers = {}
+        self._roles = {}
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.uninstall()
+
+    def install(self):
+        """
+        Makes aws_clients.get_client build its clients from this backend.
+        :return: The backend itself
+        """
+        set_client_factory(self.client)
+        return self
+
+    @staticmethod
+    def uninstall():
+        """
+        Restores boto3 as the builder of the clients.
+        """
+        set_client_factory(None)
+
+    def client(self, service: str, credentials: dict = None, config=None):
+        """
+        Client factory (see aws_clients.set_client_factory)
+        :return: FakeLambdaClient or FakeIAMClient
+        """
+        region = credentials['region'] if credentials else self.default_region
+        if service == 'lambda':
+            return FakeLambdaClient(self, region)
+        if service == 'iam':
+            return FakeIAMClient(self)
+        raise ValueError(f'The fake backend does not support the {service} service')
+
+    def add_function(self, name: str, region: str = None, tags: dict = None, **configuration) -> dict:
+        """
+        Adds a lambda function, the configuration keys are the ones of the get_function Configuration.
+        :return: The configuration of the function
+        """
+        region = region or self.default_region
+        function = {
+            'FunctionName': name,
+            'FunctionArn': f'arn:aws:lambda:{region}:{self.account_id}:function:{name}',
+            'Runtime': 'python3.7',
+            'Role': f'arn:aws:iam::{self.account_id}:role/lambda_role',
+            'Handler': 'lambda_function.lambda_handler',
+            'Description': '',
+            'Timeout': 3,
+            'MemorySize': 128,
+            'CodeSha256': '',
+            'State': 'Active',
+            'LastUpdateStatus': 'Successful'
+        }
+        function.update(configuration)
+        with self._lock:
+            self._functions[(region, name)] = {'Configuration': function, 'Tags': dict(tags or {}), 'pending_polls': 0}
+        return function
+
+    def add_layer(self, name: str, versions: int = 1, region: str = None):
+        """
+        Adds a lambda layer with versions 1 to <versions>, or more versions to an existing layer.
+        """
+        region = region or self.default_region
+        with self._lock:
+            self._layers[(region, name)] = self._layers.get((region, name), 0) + versions
+
+    def add_role(self, name: str) -> str:
+        """
+        Adds an IAM role
+        :return: The ARN of the role
+        """
+        arn = f'arn:aws:iam::{self.account_id}:role/{name}'
+        with self._lock:
+            self._roles[name] = arn
+        return arn
+
+    def layer_arn(self, name: str, version: int, region: str = None) -> str:
+        return f'arn:aws:lambda:{region or self.default_region}:{self.account_id}:layer:{name}:{version}'
+
+    def call(self, operation_name: str):
+        """
+        Accounts for one call: counts it, waits for its latency and raises the connection and throttling errors.
+        """
+        with self._lock:
+            self.call_counts[operation_name] += 1
+            if self.connection_failures[operation_name] > 0:
+                self.connection_failures[operation_name] -= 1
+                raise EndpointConnectionError(endpoint_url=f'https://lambda.{self.default_region}.amazonaws.com/')
+            throttled = self.throttle_rate > 0 and self._random.random() < self.throttle_rate
+            if throttled:
+                self.throttle_counts[operation_name] += 1
+        latency = self.latency.get(operation_name, 0.0) if isinstance(self.latency, dict) else self.latency
+        if latency:
+            time.sleep(latency)
+        if throttled:
+            raise _client_error('ThrottlingException', 'Rate exceeded', operation_name, 429)
+
+    def total_calls(self) -> int:
+        return sum(self.call_counts.values())
+
+
+class FakeLambdaClient:
+    """
+    Fake of the boto3 lambda client, backed by a FakeAWSBackend
+    """
+    page_size = 50
+
+    def __init__(self, backend: FakeAWSBackend, region: str):
+        self.backend = backend
+        self.region = region
+
+    @staticmethod
+    def _response(**kwargs) -> dict:
+        return dict(ResponseMetadata={'HTTPStatusCode': 200}, **kwargs)
+
+    def _page(self, items: list, marker: str = None, max_items: int = None) -> tuple:
+        start = int(marker) if marker else 0
+        end = start + (max_items or self.page_size)
+        return items[start:end], (str(end) if end < len(items) else None)
+
+    def _function(self, operation_name: str, function_name: str) -> dict:
+        function = self.backend._functions.get((self.region, function_name))
+        if function is None:
+            raise _client_error('ResourceNotFoundException', f'Function not found: {function_name}',
+                                operation_name, 404)
+        return function
+
+    def get_function(self, FunctionName: str) -> dict:
+        self.backend.call('GetFunction')
+        function = self._function('GetFunction', FunctionName)
+        return self._response(Configuration=dict(function['Configuration']), Tags=dict(function['Tags']))
+
+    def get_function_configuration(self, FunctionName: str) -> dict:
+        self.backend.call('GetFunctionConfiguration')
+        with self.backend._lock:
+            function = self._function('GetFunctionConfiguration', FunctionName)
+            configuration = dict(function['Configuration'])
+            if function['pending_polls'] > 0:
+                function['pending_polls'] -= 1
+                if function['pending_polls'] == 0:
+                    self._settle(function)
+        return self._response(**configuration)
+
+    def _settle(self, function: dict):
+        configuration = function['Configuration']
+        failed = configuration['FunctionName'] in self.backend.failing_functions
+        if configuration['State'] == 'Pending':
+            configuration['State'] = 'Failed' if failed else 'Active'
+            configuration['StateReason'] = 'Failed to create the function' if failed else ''
+        else:
+            configuration['LastUpdateStatus'] = 'Failed' if failed else 'Successful'
+            configuration['LastUpdateStatusReason'] = 'Failed to update the function' if failed else ''
+
+    def _start_update(self, operation_name: str, function: dict):
+        if function['Configuration']['LastUpdateStatus'] == 'InProgress':
+            raise _client_error('ResourceConflictException', 'An update is in progress for the function',
+                                operation_name, 409)
+        function['Configuration']['LastUpdateStatus'] = 'InProgress'
+        function['pending_polls'] = self.backend.pending_polls
+        if function['pending_polls'] == 0:
+            self._settle(function)
+
+    @staticmethod
+    def _code_sha256(zip_file: bytes) -> str:
+        return base64.b64encode(hashlib.sha256(zip_file).digest()).decode()
+
+    def create_function(self, FunctionName: str, Code: dict, Publish: bool = False, Tags: dict = None,
+                        Layers: list = None, **configuration) -> dict:
+        self.backend.call('CreateFunction')
+        with self.backend._lock:
+            if (self.region, FunctionName) in self.backend._functions:
+                raise _client_error('ResourceConflictException', f'Function already exist: {FunctionName}',
+                                    'CreateFunction', 409)
+        function = self.backend.add_function(FunctionName, region=self.region, tags=Tags,
+                                             Layers=[{'Arn': arn} for arn in Layers or []],
+                                             CodeSha256=self._code_sha256(Code.get('ZipFile') or b''),
+                                             State='Pending', LastUpdateStatus='Successful', **configuration)
+        with self.backend._lock:
+            stored = self.backend._functions[(self.region, FunctionName)]
+            stored['pending_polls'] = self.backend.pending_polls
+            if stored['pending_polls'] == 0:
+                self._settle(stored)
+        return self._response(**function)
+
+    def update_function_code(self, FunctionName: str, ZipFile: bytes = None, Publish: bool = False,
+                             **kwargs) -> dict:
+        self.backend.call('UpdateFunctionCode')
+        with self.backend._lock:
+            function = self._function('UpdateFunctionCode', FunctionName)
+            self._start_update('UpdateFunctionCode', function)
+            function['Configuration']['CodeSha256'] = self._code_sha256(ZipFile or b'')
+            return self._response(**function['Configuration'])
+
+    def update_function_configuration(self, FunctionName: str, Layers: list = None, **configuration) -> dict:
+        self.backend.call('UpdateFunctionConfiguration')
+        with self.backend._lock:
+            function = self._function('UpdateFunctionConfiguration', FunctionName)
+            self._start_update('UpdateFunctionConfiguration', function)
+            function['Configuration'].update(configuration)
+            if Layers is not None:
+                function['Configuration']['Layers'] = [{'Arn': arn} for arn in Layers]
+            return self._response(**function['Configuration'])
+
+    def tag_resource(self, Resource: str, Tags: dict) -> dict:
+        self.backend.call('TagResource')
+        with self.backend._lock:
+            function = self._function('TagResource', Resource.split(':')[-1])
+            function['Tags'].update(Tags)
+        return self._response()
+
+    def list_functions(self, Marker: str = None, MaxItems: int = None) -> dict:
+        self.backend.call('ListFunctions')
+        functions = [dict(function['Configuration']) for (region, _), function in
+                     sorted(self.backend._functions.items()) if region == self.region]
+        page, next_marker = self._page(functions, Marker, MaxItems)
+        response = self._response(Functions=page)
+        if next_marker:
+            response['NextMarker'] = next_marker
+        return response
+
+    def list_layer_versions(self, LayerName: str, Marker: str = None, MaxItems: int = None) -> dict:
+        self.backend.call('ListLayerVersions')
+        versions = self.backend._layers.get((self.region, LayerName), 0)
+        layer_versions = [{'LayerVersionArn': self.backend.layer_arn(LayerName, version, self.region),
+                           'Version': version} for version in range(versions, 0, -1)]
+        page, next_marker = self._page(layer_versions, Marker, MaxItems)
+        response = self._response(LayerVersions=page)
+        if next_marker:
+            response['NextMarker'] = next_marker
+        return response
+
+    def list_layers(self, Marker: str = None, MaxItems: int = None) -> dict:
+        self.backend.call('ListLayers')
+        layers = [{'LayerName': name,
+                   'LayerArn': self.backend.layer_arn(name, versions, region).rsplit(':', 1)[0],
+                   'LatestMatchingVersion': {'LayerVersionArn': self.backend.layer_arn(name, versions, region),
+                                             'Version': versions}}
+                  for (region, name), versions in sorted(self.backend._layers.items())
+                  if region == self.region and versions > 0]
+        page, next_marker = self._page(layers, Marker, MaxItems)
+        response = self._response(Layers=page)
+        if next_marker:
+            response['NextMarker'] = next_marker
+        return response
+
+
+class FakeIAMClient:
+    """
+    Fake of the boto3 iam client, backed by a FakeAWSBackend
+    """
+    page_size = 100
+
+    def __init__(self, backend: FakeAWSBackend):
+        self.backend = backend
+
+    def get_role(self, RoleName: str) -> dict:
+        self.backend.call('GetRole')
+        if RoleName not in self.backend._roles:
+            raise _client_error('NoSuchEntity', f'The role with name {RoleName} cannot be found.', 'GetRole', 404)
+        return {'ResponseMetadata': {'HTTPStatusCode': 200},
+                'Role': {'RoleName': RoleName, 'Arn': self.backend._roles[RoleName]}}
+
+    def list_roles(self, Marker: str = None, MaxItems: int = None) -> dict:
+        self.backend.call('ListRoles')
+        roles = [{'RoleName': name, 'Arn': arn} for name, arn in sorted(self.backend._roles.items())]
+        start = int(Marker) if Marker else 0
+        end = start + (MaxItems or self.page_size)
+        response = {'ResponseMetadata': {'HTTPStatusCode': 200}, 'Roles': roles[start:end],
+                    'IsTruncated': end < len(roles)}
+        if end < len(roles):
+            response['Marker'] = str(end)
+        return response
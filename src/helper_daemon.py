@@ -0,0 +1,249 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+"""
+
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+
+try:
+    from src.lookup_cache import DEFAULT_CACHE_DIR, DEFAULT_TTLS, LookupCache
+except ImportError:
+    from lookup_cache import DEFAULT_CACHE_DIR, DEFAULT_TTLS, LookupCache
+
+DEFAULT_SOCKET = os.path.join(DEFAULT_CACHE_DIR, 'daemon.sock')
+CONNECT_TIMEOUT = 0.2
+# seconds to wait for the answer, a few times the slowest lookup (with its retries). A daemon that is hung or suspended
+# still accepts connections, the caller then runs the lookup itself.
+READ_TIMEOUT = 60.0
+# the environment variables deciding which default credentials boto3 uses, requests made without explicit credentials
+# are only served by a daemon running with the same ones
+AWS_ENVIRONMENT = ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN', 'AWS_PROFILE',
+                   'AWS_DEFAULT_REGION', 'AWS_REGION', 'AWS_CONFIG_FILE', 'AWS_SHARED_CREDENTIALS_FILE']
+# operations returning a tuple, which JSON turns into a list
+TUPLE_RESULTS = {'resolve_lookups', 'resolve_region_lookups'}
+
+
+class DaemonUnavailable(Exception):
+    """
+    The daemon is not running (or can not serve the request), the caller runs the operation itself
+    """
+
+
+def socket_path() -> str:
+    """
+    :return: The path of the daemon socket, from $DATA_CI_DAEMON_SOCKET (empty or none disables the daemon) or in the
+    cache directory. None if the daemon is disabled.
+    """
+    path = os.environ.get('DATA_CI_DAEMON_SOCKET', DEFAULT_SOCKET)
+    return None if path.strip().lower() in ('', 'none') else path
+
+
+def _aws_environment() -> dict:
+    return {name: os.environ.get(name) for name in AWS_ENVIRONMENT}
+
+
+def request(operation: str, path: str = None, **kwargs):
+    """
+    Sends one request to the daemon.
+    :param operation: Name of the operation, eg. check_lambda_exists (see LookupDaemon.operations)
+    :param path: Path of the daemon socket, defaults to socket_path()
+    :param kwargs: The arguments of the operation, they must be JSON serializable
+    :return: The result of the operation. DaemonUnavailable is raised if there is no daemon to serve it, any other
+    exception is the error of the operation itself (a daemon not answering within READ_TIMEOUT is unavailable).
+    """
+    path = path or socket_path()
+    if path is None or not hasattr(socket, 'AF_UNIX') or not os.path.exists(path):
+        raise DaemonUnavailable('The daemon is not running')
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(CONNECT_TIMEOUT)
+            connection.connect(path)
+            connection.settimeout(READ_TIMEOUT)
+            message = {'operation': operation, 'kwargs': kwargs, 'environment': _aws_environment()}
+            connection.sendall(json.dumps(message).encode() + b'\n')
+            with connection.makefile('rb') as f:
+                line = f.readline()
+        response = json.loads(line.decode())
+    except (OSError, ValueError) as e:
+        raise DaemonUnavailable(f'The daemon did not answer: {e}')
+    if 'unavailable' in response:
+        raise DaemonUnavailable(response['unavailable'])
+    if 'error' in response:
+        raise Exception(f'The daemon failed to run {operation}: {response["error"]}')
+    result = response['result']
+    return tuple(result) if operation in TUPLE_RESULTS else result
+
+
+def run_via_daemon(operation: str, function, use_cache: bool = False, **kwargs):
+    """
+    Runs the operation on the daemon when it is running, otherwise calls the function in process. The operations are
+    lookups without side effects, so one interrupted on the daemon is simply run again.
+    :param operation: Name of the operation (see LookupDaemon.operations)
+    :param function: The function to call in process, with the same arguments
+    :param use_cache: If True, the daemon answers the role and layer lookups from its cache (the caller asked for a
+    cache, eg. with --cache). A daemon without a cache leaves the request to the function then.
+    :param kwargs: The arguments, JSON serializable
+    :return: The result of the operation
+    """
+    try:
+        result = request(operation, **(dict(kwargs, use_cache=True) if use_cache else kwargs))
+        print(f'Ran {operation} on the helper daemon')
+        return result
+    except DaemonUnavailable:
+        return function(**kwargs)
+
+
+class MemoryLookupCache(LookupCache):
+    """
+    In memory version of the LookupCache, for the daemon. Entries expire after the same time to live.
+    """
+
+    def __init__(self, ttls: dict = None):
+        super().__init__(cache_dir=None, ttls=ttls)
+        self._entries = {}
+
+    def _load(self) -> dict:
+        return self._entries
+
+    def _save(self, entries: dict):
+        now = time.time()
+        self._entries = {key: entry for key, entry in entries.items() if entry['expires'] > now}
+
+
+class LookupDaemon:
+    """
+    Serves the lookups of the utilities on a Unix socket, one JSON request per line, with warm clients (the memoized
+    clients of aws_clients live as long as the daemon) and optionally a result cache of the role and layer lookups.
+    Requests are of the form {"operation": <name>, "kwargs": {<argument>: <value>}, "environment": {<AWS variable>:
+    <value>}} and are answered with {"result": <result>}, {"error": <message>} or {"unavailable": <reason>}.
+    """
+
+    def __init__(self, path: str = None, cache: bool = False, ttls: dict = None):
+        """
+        :param path: Path of the socket, defaults to socket_path()
+        :param cache: If True, the role and layer ARNs are cached in memory for the times to live of the lookup cache,
+        for the requests asking for it (use_cache)
+        :param ttls: Dictionary of <kind>: <time to live in seconds>, overrides the DEFAULT_TTLS
+        """
+        try:
+            from src.check_lambda_function_exists import check_lambda_exists, check_lambda_exists_batch
+            from src.create_lambda_deployment_json import resolve_lookups, resolve_region_lookups
+        except ImportError:
+            from check_lambda_function_exists import check_lambda_exists, check_lambda_exists_batch
+            from create_lambda_deployment_json import resolve_lookups, resolve_region_lookups
+        self.path = path or socket_path() or DEFAULT_SOCKET
+        self.cache = MemoryLookupCache(ttls=dict(DEFAULT_TTLS, **(ttls or {}))) if cache else None
+        self.environment = _aws_environment()
+        self.requests = 0
+        self._server = None
+        self.operations = {
+            'ping': lambda: {'pid': os.getpid(), 'requests': self.requests, 'cache': self.cache is not None},
+            'check_lambda_exists': check_lambda_exists,
+            'check_lambda_exists_batch': check_lambda_exists_batch,
+            'resolve_lookups': lambda use_cache=False, **kwargs:
+            resolve_lookups(cache=self.cache if use_cache else None, **kwargs),
+            'resolve_region_lookups': lambda use_cache=False, **kwargs:
+            resolve_region_lookups(cache=self.cache if use_cache else None, **kwargs),
+            'invalidate': lambda **kwargs: self.cache.invalidate(**kwargs) if self.cache is not None else 0,
+            'stop': lambda: threading.Thread(target=self.stop).start()
+        }
+
+    def handle(self, message: dict) -> dict:
+        """
+        :param message: The request
+        :return: The response
+        """
+        self.requests += 1
+        operation = self.operations.get(message.get('operation'))
+        if operation is None:
+            return {'error': f'Unknown operation {message.get("operation")}'}
+        kwargs = message.get('kwargs') or {}
+        if 'credentials' in kwargs and kwargs['credentials'] is None and \
+                message.get('environment', self.environment) != self.environment:
+            return {'unavailable': 'The daemon runs with other AWS credentials'}
+        if kwargs.get('use_cache') and self.cache is None:
+            return {'unavailable': 'The daemon does not cache the lookups'}
+        try:
+            return {'result': operation(**kwargs)}
+        except:
+            print(f'There was an error in {message.get("operation")}. \n{traceback.format_exc()}')
+            return {'error': traceback.format_exc(limit=0).strip()}
+
+    def serve(self):
+        """
+        Listens on the socket until stop is called (eg. by the stop operation). The socket is only accessible to the
+        user, since the requests carry credentials.
+        """
+        import socketserver
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        response = daemon.handle(json.loads(line.decode()))
+                    except ValueError:
+                        response = {'error': 'The request is not valid JSON'}
+                    self.wfile.write(json.dumps(response).encode() + b'\n')
+
+        if os.path.exists(self.path):
+            try:
+                request('ping', path=self.path)
+                raise Exception(f'A daemon is already running on {self.path}')
+            except DaemonUnavailable:
+                os.remove(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        previous_umask = os.umask(0o077)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        finally:
+            os.umask(previous_umask)
+        self._server.daemon_threads = True
+        print(f'Listening on {self.path}')
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+if __name__ == "__main__":
+    try:
+        parser = argparse.ArgumentParser('Helper daemon keeping warm AWS clients (and cached lookups) between runs')
+        parser.add_argument('--socket', help='Path of the socket, defaults to $DATA_CI_DAEMON_SOCKET or daemon.sock in '
+                                             'the cache directory', default=None)
+        parser.add_argument('--cache', help='Cache the role and layer ARNs in memory, for the callers run with --cache',
+                            action='store_true')
+        parser.add_argument('--status', help='Print the status of the running daemon', action='store_true')
+        parser.add_argument('--stop', help='Stop the running daemon', action='store_true')
+        parser.add_argument('--invalidate-layers', help='Remove these layers from the cache of the running daemon, eg. '
+                                                        'right after publishing them', nargs='+', default=None)
+        args = parser.parse_args()
+
+        if args.status:
+            print(request('ping', path=args.socket))
+        elif args.stop:
+            request('stop', path=args.socket)
+            print('Stopped the daemon')
+        elif args.invalidate_layers is not None:
+            removed = sum(request('invalidate', path=args.socket, kind='layer', name=layer)
+                          for layer in args.invalidate_layers)
+            print(f'Removed {removed} entries')
+        else:
+            LookupDaemon(path=args.socket, cache=args.cache).serve()
+    except SystemExit:
+        raise
+    except:
+        print(f'There was an error in the process. \n{traceback.format_exc()}')
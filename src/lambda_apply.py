@@ -0,0 +1,223 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+"""
+
+import argparse
+import base64
+import json
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from src import aws_metrics
+    from src.aws_clients import get_client, call_with_retry, credentials_from_args
+    from src.check_lambda_function_exists import check_lambda_exists
+    from src.deployment_diff import commit_state
+    from src.package_builder import code_sha256, deployed_code_sha256
+except ImportError:
+    import aws_metrics
+    from aws_clients import get_client, call_with_retry, credentials_from_args
+    from check_lambda_function_exists import check_lambda_exists
+    from deployment_diff import commit_state
+    from package_builder import code_sha256, deployed_code_sha256
+
+# keys of a create_json payload that update_function_configuration does not take
+CREATE_ONLY_KEYS = ['FunctionName', 'Code', 'Publish', 'Tags']
+DEFAULT_REPORT_FILE = 'apply_report.json'
+
+
+def wait_for_function(function_name: str, credentials: dict = None, aws_client=None, poll_interval: float = 1.0,
+                      timeout: float = 300.0) -> dict:
+    """
+    Polls the configuration of the function until it is neither Pending (being created) nor InProgress (being
+    updated). The polls go through call_with_retry, under the rate limit shared with every other call.
+    :param function_name: The name of the function
+    :param credentials: AWS credentials to use, can be None (uses default). Same form as check_lambda_exists
+    :param aws_client: Boto3 lambda client to use. If None, the shared client for the credentials is used.
+    :param poll_interval: Seconds between the polls
+    :param timeout: Seconds to wait before giving up
+    :return: The configuration of the function. An exception is raised if the create/update failed or timed out.
+    """
+    client = aws_client if aws_client is not None else get_client('lambda', credentials)
+    deadline = time.monotonic() + timeout
+    while True:
+        configuration = call_with_retry(client, 'get_function_configuration', credentials, FunctionName=function_name)
+        if configuration.get('State') == 'Failed':
+            raise Exception(f'The function {function_name} failed: {configuration.get("StateReason")}')
+        if configuration.get('LastUpdateStatus') == 'Failed':
+            raise Exception(f'The update of {function_name} failed: {configuration.get("LastUpdateStatusReason")}')
+        if configuration.get('State') != 'Pending' and configuration.get('LastUpdateStatus') != 'InProgress':
+            return configuration
+        if time.monotonic() + poll_interval > deadline:
+            raise Exception(f'Timed out after {timeout} seconds waiting for {function_name}')
+        time.sleep(poll_interval)
+
+
+def apply_function(payload: dict, zip_file: bytes = None, credentials: dict = None, aws_client=None,
+                   poll_interval: float = 1.0, timeout: float = 300.0) -> dict:
+    """
+    Creates the function if it does not exist, otherwise updates its code and then its configuration (the same steps
+    as staging.sh). Every step waits for the function to settle before the next one. The code update is skipped when
+    the deployed CodeSha256 is the one of the zip.
+    :param payload: Deployment JSON created by create_json. Its Code section is used if it has one (with the ZipFile
+    base64 encoded, see package_builder.fill_code), otherwise zip_file.
+    :param zip_file: Content of the deployment package, None to only create/update the configuration of a function
+    whose payload has no Code section (updates then keep the current code)
+    :param credentials: AWS credentials to use, can be None (uses default). Same form as check_lambda_exists
+    :param aws_client: Boto3 lambda client to use. If None, the shared client for the credentials is used.
+    :param poll_interval: Seconds between the polls of the function state
+    :param timeout: Seconds to wait for every step to settle
+    :return: Dictionary with the function, the action (create or update, None if the existence check failed), the
+    status (Successful or Failed), whether the code was uploaded, the error (None on success) and the duration in
+    seconds
+    """
+    start = time.perf_counter()
+    function_name = payload['FunctionName']
+    result = {'function': function_name, 'action': None, 'status': 'Failed', 'code_uploaded': False, 'error': None}
+    try:
+        client = aws_client if aws_client is not None else get_client('lambda', credentials)
+        exists = check_lambda_exists(function_name, credentials, aws_client=client)
+        if exists == -1:
+            raise Exception(f'Could not check whether {function_name} exists')
+        code = payload.get('Code') or ({'ZipFile': zip_file} if zip_file is not None else None)
+        if code is not None and isinstance(code.get('ZipFile'), str):
+            code = dict(code, ZipFile=base64.b64decode(code['ZipFile']))
+        if exists == 0:
+            result['action'] = 'create'
+            if code is None:
+                raise Exception(f'{function_name} does not exist and there is no code to create it with')
+            print(f'Creating {function_name}')
+            call_with_retry(client, 'create_function', credentials, **dict(payload, Code=code))
+            result['code_uploaded'] = True
+            wait_for_function(function_name, credentials, client, poll_interval, timeout)
+        else:
+            result['action'] = 'update'
+            if code is not None and 'ZipFile' in code and \
+                    deployed_code_sha256(function_name, credentials, client) == code_sha256(code['ZipFile']):
+                print(f'The code of {function_name} is unchanged')
+            elif code is not None:
+                print(f'Updating the code of {function_name}')
+                call_with_retry(client, 'update_function_code', credentials, FunctionName=function_name,
+                                Publish=False, **code)
+                result['code_uploaded'] = True
+                wait_for_function(function_name, credentials, client, poll_interval, timeout)
+            print(f'Updating the configuration of {function_name}')
+            configuration = {key: value for key, value in payload.items() if key not in CREATE_ONLY_KEYS}
+            response = call_with_retry(client, 'update_function_configuration', credentials,
+                                       FunctionName=function_name, **configuration)
+            if payload.get('Tags'):
+                call_with_retry(client, 'tag_resource', credentials, Resource=response['FunctionArn'],
+                                Tags=payload['Tags'])
+            wait_for_function(function_name, credentials, client, poll_interval, timeout)
+        result['status'] = 'Successful'
+    except:
+        print(f'There was an error applying {function_name}. \n{traceback.format_exc()}')
+        result['error'] = str(sys.exc_info()[1])
+    result['duration'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def apply_functions(payloads: list, zip_file: bytes = None, credentials: dict = None, max_workers: int = 10,
+                    poll_interval: float = 1.0, timeout: float = 300.0, state_file: str = None) -> dict:
+    """
+    Applies many deployment JSONs at the same time, sharing one client (and its rate limit).
+    :param payloads: List of deployment JSONs created by create_json
+    :param zip_file: Content of the deployment package of the payloads without a Code section (see apply_function)
+    :param credentials: AWS credentials to use, can be None (uses default). Same form as check_lambda_exists
+    :param max_workers: Maximum number of functions applied at the same time. Default is 10.
+    :param poll_interval: Seconds between the polls of the function state
+    :param timeout: Seconds to wait for every step of a function to settle
+    :param state_file: State file of deployment_diff, the pending hashes of the successful functions are committed.
+    :return: Dictionary of <function_name>: <result of apply_function>, in the order of the payloads
+    """
+    client = get_client('lambda', credentials, max_pool_connections=max(max_workers, 10))
+    print(f'Applying {len(payloads)} functions')
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(payloads)))) as executor:
+        results = list(executor.map(lambda payload: apply_function(payload, zip_file, credentials, client,
+                                                                   poll_interval, timeout), payloads))
+    results = {result['function']: result for result in results}
+    if state_file is not None:
+        committed = commit_state(state_file, [name for name, result in results.items()
+                                              if result['status'] == 'Successful'])
+        print(f'Committed the state of {len(committed)} functions')
+    return results
+
+
+def print_report(results: dict):
+    """
+    Prints one line per function with the action, the status and the duration, followed by the errors.
+    """
+    print(f'{"function":<40} {"action":<8} {"status":<10} {"seconds":>8}')
+    for name, result in results.items():
+        print(f'{name:<40} {result["action"] or "-":<8} {result["status"]:<10} {result["duration"]:>8.1f}')
+    for name, result in results.items():
+        if result['error'] is not None:
+            print(f'{name}: {result["error"]}')
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the command line arguments
+    :param parser: The parser (or sub parser) to add them to
+    """
+    parser.add_argument('--configs', help='Deployment JSON file(s) created by create_lambda_deployment_json.py, '
+                                          'multiple files can be entered with spaces', nargs='+', required=True)
+    parser.add_argument('--zip-file', help='Deployment package of the functions whose JSON has no Code section',
+                        default=None)
+    parser.add_argument('--access', help='AWS access key', default=None)
+    parser.add_argument('--secret', help='AWS secret key', default=None)
+    parser.add_argument('--region', help='AWS Region', default='us-east-2')
+    parser.add_argument('--workers', help='Number of functions applied at the same time', type=int, default=10)
+    parser.add_argument('--poll-interval', help='Seconds between the polls of the function state', type=float,
+                        default=1.0)
+    parser.add_argument('--timeout', help='Seconds to wait for every create/update to settle', type=float,
+                        default=300.0)
+    parser.add_argument('--state-file', help='State file of deployment_diff.py, the pending hashes of the functions '
+                                             'applied successfully are committed', default=None)
+    parser.add_argument('--output', help='File for the JSON report of every function', default=DEFAULT_REPORT_FILE)
+    parser.add_argument('--profile', help='Print a timing summary of the AWS calls at exit', action='store_true')
+    parser.add_argument('--profile-output', help='Append every AWS call, client creation and cache lookup to this '
+                                                 'file as JSON lines', default=None)
+
+
+def run(args: argparse.Namespace, parser: argparse.ArgumentParser = None):
+    """
+    Applies the deployment JSONs with the parsed command line arguments (see add_arguments) and writes the report.
+    Exits with status 1 if any function failed.
+    """
+    if args.profile or args.profile_output is not None:
+        aws_metrics.enable(output_path=args.profile_output, summary_at_exit=args.profile)
+
+    aws_credentials = credentials_from_args(args)
+
+    payloads = []
+    for path in args.configs:
+        with open(path, 'r') as f:
+            payloads.append(json.load(f))
+    zip_file = None
+    if args.zip_file is not None:
+        with open(args.zip_file, 'rb') as f:
+            zip_file = f.read()
+
+    results = apply_functions(payloads, zip_file=zip_file, credentials=aws_credentials, max_workers=args.workers,
+                              poll_interval=args.poll_interval, timeout=args.timeout, state_file=args.state_file)
+    with open(args.output, 'w') as f:
+        json.dump(obj=list(results.values()), fp=f, indent=4)
+    print_report(results)
+    if any(result['status'] != 'Successful' for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    try:
+        parser = argparse.ArgumentParser('Create or update lambda functions from their deployment JSONs')
+        add_arguments(parser)
+        run(parser.parse_args(), parser)
+    except SystemExit:
+        raise
+    except:
+        print(f'There was an error in the process. \n{traceback.format_exc()}')
+        sys.exit(1)
@@ -0,0 +1,182 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+import traceback
+from functools import lru_cache
+
+try:
+    from src import aws_metrics
+except ImportError:
+    import aws_metrics
+
+DEFAULT_CACHE_DIR = os.environ.get('DATA_CI_CACHE_DIR',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'data_ci_utilities'))
+DEFAULT_TTLS = {
+    'role': 24 * 60 * 60,
+    'layer': 60 * 60
+}
+CACHE_FILE_NAME = 'lookups.json'
+
+
+@lru_cache(maxsize=None)
+def default_identity() -> tuple:
+    """
+    Resolves the access key and region the default boto3 session (environment, profile, config files) uses, so the
+    lookups made without explicit credentials are cached per account and region too.
+    :return: Tuple with the access key and the region, empty strings for what can not be resolved.
+    """
+    import boto3
+    session = boto3.session.Session()
+    session_credentials = session.get_credentials()
+    return (session_credentials.access_key if session_credentials is not None else '',
+            session.region_name or '')
+
+
+class LookupCache:
+    """
+    Persistent cache for the ARN lookups (role and layer ARNs), stored as a JSON file in the cache directory.
+    Every entry has its own expiry time, entries are keyed on the kind, the AWS access key, the region and the name.
+    The file is read on every access, so entries invalidated by another process are never served.
+    """
+
+    def __init__(self, cache_dir: str = None, refresh: bool = False, ttls: dict = None):
+        """
+        :param cache_dir: Directory to keep the cache file in. Defaults to $DATA_CI_CACHE_DIR or
+        ~/.cache/data_ci_utilities
+        :param refresh: If True, every get is a miss (the lookups go to AWS) but the fresh values are still stored.
+        :param ttls: Dictionary of <kind>: <time to live in seconds>, overrides the DEFAULT_TTLS
+        """
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.path = os.path.join(self.cache_dir, CACHE_FILE_NAME)
+        self.refresh = refresh
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind: str, name: str, credentials: dict = None) -> str:
+        """
+        Builds the cache key. IAM is global, so the region is left out of the role keys.
+        :param kind: The kind of lookup, eg. role or layer
+        :param name: The name of the role or layer
+        :param credentials: The aws credentials (same form as the helpers), can be None for the default ones (see
+        default_identity).
+        :return: String with the cache key
+        """
+        account, region = (credentials['aws_key'], credentials['region']) if credentials else default_identity()
+        if credentials and account is None:
+            # the default credentials in an explicit region (see create_lambda_deployment_json.region_credentials)
+            account = default_identity()[0]
+        region = '' if kind == 'role' else region
+        return f'{kind}:{account}:{region}:{name}'
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, entries: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        now = time.time()
+        entries = {key: entry for key, entry in entries.items() if entry['expires'] > now}
+        temp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(obj=entries, fp=f)
+        os.replace(temp_path, self.path)
+
+    def get(self, kind: str, name: str, credentials: dict = None):
+        """
+        :return: The cached value, None if it is not cached, expired, or the cache is refreshing.
+        """
+        if self.refresh:
+            aws_metrics.record('cache', kind, hit=False, key=name)
+            return None
+        key = self.key(kind, name, credentials)
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None or entry['expires'] <= time.time():
+            aws_metrics.record('cache', kind, hit=False, key=name)
+            return None
+        aws_metrics.record('cache', kind, hit=True, key=name)
+        return entry['value']
+
+    def set(self, kind: str, name: str, value: str, credentials: dict = None, ttl: int = None):
+        """
+        Stores the value and writes the cache file.
+        :param ttl: Time to live in seconds, defaults to the ttl of the kind.
+        """
+        ttl = self.ttls[kind] if ttl is None else ttl
+        key = self.key(kind, name, credentials)
+        with self._lock:
+            entries = self._load()
+            entries[key] = {'value': value, 'expires': time.time() + ttl}
+            self._save(entries)
+
+    def invalidate(self, kind: str = None, name: str = None, credentials: dict = None) -> int:
+        """
+        Removes entries from the cache. Without arguments the whole cache is cleared.
+        :param kind: Only remove entries of this kind, eg. layer
+        :param name: Only remove entries with this name, eg. the layer that was just published
+        :param credentials: Only remove the entries of this access key and region. None removes them for every
+        account and region.
+        :return: The number of entries removed
+        """
+        with self._lock:
+            entries = self._load()
+            to_remove = []
+            for key in entries:
+                key_kind, key_account, key_region, key_name = key.split(':', 3)
+                if kind is not None and key_kind != kind:
+                    continue
+                if name is not None and key_name != name:
+                    continue
+                if credentials is not None and key != self.key(key_kind, key_name, credentials):
+                    continue
+                to_remove.append(key)
+            for key in to_remove:
+                del entries[key]
+            self._save(entries)
+            return len(to_remove)
+
+
+if __name__ == "__main__":
+    try:
+        parser = argparse.ArgumentParser('Invalidate the local cache of role and layer ARN lookups')
+        parser.add_argument('--cache-dir', help='Directory of the cache', default=None)
+        parser.add_argument('--layers', help='Layer name(s) to invalidate, eg. right after publishing them', nargs='+')
+        parser.add_argument('--roles', help='Role name(s) to invalidate', nargs='+')
+        parser.add_argument('--all', help='Clear the whole cache', action='store_true')
+        args = parser.parse_args()
+
+        cache = LookupCache(cache_dir=args.cache_dir)
+        removed = 0
+        if args.all:
+            removed += cache.invalidate()
+        for layer in args.layers or []:
+            removed += cache.invalidate(kind='layer', name=layer)
+        for role in args.roles or []:
+            removed += cache.invalidate(kind='role', name=role)
+        print(f'Removed {removed} entries from {cache.path}')
+
+        # the cache of a running helper daemon stands in for this one, it is invalidated too
+        try:
+            from src.helper_daemon import request, DaemonUnavailable
+        except ImportError:
+            from helper_daemon import request, DaemonUnavailable
+        try:
+            removed = request('invalidate') if args.all else 0
+            removed += sum(request('invalidate', kind='layer', name=layer) for layer in args.layers or [])
+            removed += sum(request('invalidate', kind='role', name=role) for role in args.roles or [])
+            print(f'Removed {removed} entries from the helper daemon')
+        except DaemonUnavailable:
+            pass
+    except:
+        print(f'There was an error in the process. \n{traceback.format_exc()}')
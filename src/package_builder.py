@@ -0,0 +1,249 @@
+"""
+__author__=sshasan
+__project__=DelosDataPlatform
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import traceback
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from src.aws_clients import get_client, call_with_retry, credentials_from_args
+    from src.lookup_cache import DEFAULT_CACHE_DIR
+except ImportError:
+    from aws_clients import get_client, call_with_retry, credentials_from_args
+    from lookup_cache import DEFAULT_CACHE_DIR
+
+DEFAULT_PACKAGE_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'packages')
+DEFAULT_PACKAGE_FILE = 'my_lambda_func.zip'
+EXCLUDED_DIRECTORIES = {'__pycache__', '.git', '.idea', '.pytest_cache'}
+EXCLUDED_EXTENSIONS = ('.pyc', '.pyo', '.zip')
+COMPRESSION_LEVEL = 9
+# every member is dated 1980-01-01 00:00 (the zip epoch), so the same sources always give the same zip
+ZIP_DATE = (0 << 9) | (1 << 5) | 1
+ZIP_TIME = 0
+
+
+def code_sha256(zip_file: bytes) -> str:
+    """
+    :return: The hash of a deployment package in the form of the CodeSha256 of the lambda configuration (base64 of
+    the sha256 digest)
+    """
+    return base64.b64encode(hashlib.sha256(zip_file).digest()).decode()
+
+
+def collect_sources(source_dir: str) -> list:
+    """
+    Lists the files to package, skipping the caches, version control directories, compiled files and zips.
+    :param source_dir: Directory with the sources of the function
+    :return: Sorted list of tuples with the name of the member in the zip and the path of the file
+    """
+    sources = []
+    for directory, directories, files in os.walk(source_dir):
+        directories[:] = [name for name in directories if name not in EXCLUDED_DIRECTORIES]
+        for name in files:
+            if name.endswith(EXCLUDED_EXTENSIONS):
+                continue
+            path = os.path.join(directory, name)
+            sources.append((os.path.relpath(path, source_dir).replace(os.sep, '/'), path))
+    return sorted(sources)
+
+
+class PackageBuilder:
+    """
+    Builds deterministic deployment packages. The compressed form of every file is cached under the hash of its
+    content, so only the new and changed files are compressed again, and the compression runs on a thread pool (zlib
+    releases the GIL, so it uses every core). The members are always written in the same order, with the same date
+    and permissions, so unchanged sources give a byte identical zip with the same CodeSha256.
+    """
+
+    def __init__(self, cache_dir: str = None, max_workers: int = None, compression_level: int = COMPRESSION_LEVEL):
+        """
+        :param cache_dir: Directory of the compressed members. Defaults to packages/ in the lookup cache directory.
+        :param max_workers: Number of files compressed at the same time, defaults to the number of cores.
+        :param compression_level: zlib compression level of the members
+        """
+        self.cache_dir = cache_dir or DEFAULT_PACKAGE_CACHE_DIR
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.compression_level = compression_level
+        self.cache_hits = 0
+        self._lock = threading.Lock()
+
+    def _member(self, name: str, path: str) -> tuple:
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        cache_path = os.path.join(self.cache_dir, f'{digest}.{self.compression_level}.deflate')
+        try:
+            with open(cache_path, 'rb') as f:
+                compressed = f.read()
+            with self._lock:
+                self.cache_hits += 1
+        except OSError:
+            compressor = zlib.compressobj(self.compression_level, zlib.DEFLATED, -15)
+            compressed = compressor.compress(content) + compressor.flush()
+            temp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(temp_path, cache_path)
+        # keep the executable bit of scripts, every other permission is normalized
+        mode = 0o755 if os.stat(path).st_mode & 0o100 else 0o644
+        return name, zlib.crc32(content), len(content), compressed, mode
+
+    def build(self, source_dir: str, output_path: str = DEFAULT_PACKAGE_FILE) -> dict:
+        """
+        Zips the sources of a function.
+        :param source_dir: Directory with the sources of the function (see collect_sources)
+        :param output_path: Path of the zip to write
+        :return: Dictionary with the path, the code_sha256, the size in bytes, the number of files and the number of
+        files taken from the cache (cached)
+        """
+        start = time.perf_counter()
+        sources = collect_sources(source_dir)
+        if not sources:
+            raise Exception(f'There are no files to package in {source_dir}')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.cache_hits = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            members = list(executor.map(lambda source: self._member(*source), sources))
+
+        local_headers = []
+        central_directory = []
+        offset = 0
+        for name, crc, size, compressed, mode in members:
+            encoded_name = name.encode('utf-8')
+            header = struct.pack('<4s5H3L2H', b'PK\x03\x04', 20, 0x800, zlib.DEFLATED, ZIP_TIME, ZIP_DATE, crc,
+                                 len(compressed), size, len(encoded_name), 0) + encoded_name
+            central_directory.append(struct.pack('<4s6H3L5H2L', b'PK\x01\x02', (3 << 8) | 20, 20, 0x800,
+                                                 zlib.DEFLATED, ZIP_TIME, ZIP_DATE, crc, len(compressed), size,
+                                                 len(encoded_name), 0, 0, 0, 0, (0o100000 | mode) << 16, offset)
+                                     + encoded_name)
+            local_headers.append(header)
+            offset += len(header) + len(compressed)
+        central_directory = b''.join(central_directory)
+        end_record = struct.pack('<4s4H2LH', b'PK\x05\x06', 0, 0, len(members), len(members),
+                                 len(central_directory), offset, 0)
+        sha256 = hashlib.sha256()
+        temp_path = f'{output_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            for header, member in zip(local_headers, members):
+                for chunk in (header, member[3]):
+                    f.write(chunk)
+                    sha256.update(chunk)
+            for chunk in (central_directory, end_record):
+                f.write(chunk)
+                sha256.update(chunk)
+        os.replace(temp_path, output_path)
+
+        package = {
+            'path': output_path,
+            'code_sha256': base64.b64encode(sha256.digest()).decode(),
+            'size': offset + len(central_directory) + len(end_record),
+            'files': len(members),
+            'cached': self.cache_hits
+        }
+        print(f'Packaged {package["files"]} files ({package["cached"]} from the cache) into {output_path} in '
+              f'{time.perf_counter() - start:.3f}s')
+        return package
+
+
+def deployed_code_sha256(function_name: str, credentials: dict = None, aws_client=None):
+    """
+    :param function_name: The name of the function
+    :param credentials: AWS credentials to use, can be None (uses default). Same form as the other helpers
+    :param aws_client: Boto3 lambda client to use. If None, the shared client for the credentials is used.
+    :return: The CodeSha256 of the deployed function, None if the function does not exist
+    """
+    client = aws_client if aws_client is not None else get_client('lambda', credentials)
+    try:
+        return call_with_retry(client, 'get_function_configuration', credentials,
+                               FunctionName=function_name)['CodeSha256']
+    except Exception as e:
+        if 'ResourceNotFound' in str(e):
+            return None
+        raise
+
+
+def code_output_path(path: str) -> str:
+    """
+    :return: The path of the deployment JSON with the Code section, eg. lambda_config.code.json for lambda_config.json
+    """
+    stem, extension = os.path.splitext(path)
+    return f'{stem}.code{extension or ".json"}'
+
+
+def fill_code(payload: dict, package: dict, credentials: dict = None, skip_unchanged: bool = False) -> bool:
+    """
+    Fills the Code section of a create_json payload with the package, base64 encoded. That is the form lambda_apply
+    reads (and the one AWS CLI v2 decodes from --cli-input-json), AWS CLI v1 would upload the base64 text itself as
+    the zip.
+    :param payload: Deployment JSON created by create_json, changed in place
+    :param package: Package returned by PackageBuilder.build
+    :param credentials: AWS credentials to use for skip_unchanged, can be None (uses default)
+    :param skip_unchanged: If True and the deployed CodeSha256 of the function matches the package, the Code section
+    is left out so the code is not uploaded again
+    :return: True if the Code section was filled, False if the upload is skipped
+    """
+    if skip_unchanged and deployed_code_sha256(payload['FunctionName'], credentials) == package['code_sha256']:
+        print(f'The code of {payload["FunctionName"]} is unchanged, skipping the upload')
+        payload.pop('Code', None)
+        return False
+    with open(package['path'], 'rb') as f:
+        payload['Code'] = {'ZipFile': base64.b64encode(f.read()).decode()}
+    return True
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the command line arguments
+    :param parser: The parser (or sub parser) to add them to
+    """
+    parser.add_argument('--source-dir', help='Directory with the sources of the function', required=True)
+    parser.add_argument('--output', help='Path of the zip to write', default=DEFAULT_PACKAGE_FILE)
+    parser.add_argument('--cache-dir', help='Directory of the cache of compressed files', default=None)
+    parser.add_argument('--workers', help='Number of files compressed at the same time, defaults to the number of '
+                                          'cores', type=int, default=None)
+    parser.add_argument('--configs', help='Deployment JSON file(s) to copy with the Code section filled with the '
+                                          'package, into <config>.code.json for lambda_apply.py (the configs '
+                                          'themselves are left as they are)', nargs='+', default=None)
+    parser.add_argument('--skip-unchanged', help='Leave the Code section out of the configs of the functions whose '
+                                                 'deployed code is the same as the package', action='store_true')
+    parser.add_argument('--access', help='AWS access key', default=None)
+    parser.add_argument('--secret', help='AWS secret key', default=None)
+    parser.add_argument('--region', help='AWS Region', default='us-east-2')
+
+
+def run(args: argparse.Namespace, parser: argparse.ArgumentParser = None):
+    """
+    Builds the package with the parsed command line arguments (see add_arguments) and writes the configs with the
+    Code section
+    """
+    aws_credentials = credentials_from_args(args)
+    package = PackageBuilder(cache_dir=args.cache_dir, max_workers=args.workers).build(args.source_dir, args.output)
+    print(f'CodeSha256: {package["code_sha256"]}')
+    for path in args.configs or []:
+        with open(path, 'r') as f:
+            payload = json.load(f)
+        fill_code(payload, package, credentials=aws_credentials, skip_unchanged=args.skip_unchanged)
+        print(f'Writing the JSON file {code_output_path(path)}')
+        with open(code_output_path(path), 'w') as f:
+            json.dump(obj=payload, fp=f)
+
+
+if __name__ == "__main__":
+    try:
+        parser = argparse.ArgumentParser('Build the deployment package of a lambda function')
+        add_arguments(parser)
+        run(parser.parse_args(), parser)
+    except SystemExit:
+        raise
+    except:
+        print(f'There was an error in the process. \n{traceback.format_exc()}')
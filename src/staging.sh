@@ -61,6 +61,20 @@ elif [[ "$VAR_MODE" == "deploy" ]]; then
         -O create_lambda_deployment_json.py
     wget https://raw.githubusercontent.com/Delos-tech/Data_CI_Utilities/master/src/check_lambda_function_exists.py \
         -O check_lambda_function_exists.py
+    wget https://raw.githubusercontent.com/Delos-tech/Data_CI_Utilities/master/src/aws_clients.py \
+        -O aws_clients.py
+    wget https://raw.githubusercontent.com/Delos-tech/Data_CI_Utilities/master/src/aws_metrics.py \
+        -O aws_metrics.py
+    wget https://raw.githubusercontent.com/Delos-tech/Data_CI_Utilities/master/src/lookup_cache.py \
+        -O lookup_cache.py
+    wget https://raw.githubusercontent.com/Delos-tech/Data_CI_Utilities/master/src/deployment_diff.py \
+        -O deployment_diff.py
+    wget https://raw.githubusercontent.com/Delos-tech/Data_CI_Utilities/master/src/deployment_manifest.py \
+        -O deployment_manifest.py
+    wget https://raw.githubusercontent.com/Delos-tech/Data_CI_Utilities/master/src/account_snapshot.py \
+        -O account_snapshot.py
+    wget https://raw.githubusercontent.com/Delos-tech/Data_CI_Utilities/master/src/helper_daemon.py \
+        -O helper_daemon.py
 
     echo "DEPLOY: Creating the config json: lambda_config.json"
     python create_lambda_deployment_json.py --function ${VAR_FUNC_NAME} \
@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.account_snapshot import AccountSnapshot, take_snapshot
+from src.check_lambda_function_exists import check_lambda_exists, check_lambda_exists_batch
+from src.create_lambda_deployment_json import get_iam_role_arn, get_lambda_layer_latest_version, resolve_lookups
+from src.data_ci import main
+from src.fake_aws import FakeAWSBackend
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.aws_credentials = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'us-east-2'}
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_path = os.path.join(self.temp_dir.name, 'snapshot.json')
+        self.backend = FakeAWSBackend().install()
+        for index in range(120):
+            self.backend.add_function(f'function_{index}')
+        self.backend.add_function('other_region_function', region='us-west-2')
+        self.backend.add_layer('requests', versions=3)
+        self.backend.add_layer('jsonschema', versions=1)
+        self.role_arn = self.backend.add_role('Lambda_Role')
+
+    def tearDown(self) -> None:
+        self.backend.uninstall()
+        self.temp_dir.cleanup()
+
+    def test_take_snapshot(self):
+        snapshot = take_snapshot(self.aws_credentials)
+        self.assertEqual(set(f'function_{index}' for index in range(120)), snapshot.functions)
+        self.assertEqual({'jsonschema': self.backend.layer_arn('jsonschema', 1),
+                          'requests': self.backend.layer_arn('requests', 3)}, snapshot.layers)
+        self.assertEqual({'Lambda_Role': self.role_arn}, snapshot.roles)
+        self.assertEqual('us-east-2', snapshot.region)
+        self.assertEqual(3, self.backend.call_counts['ListFunctions'])
+        self.assertEqual(1, self.backend.call_counts['ListLayers'])
+        self.assertEqual(1, self.backend.call_counts['ListRoles'])
+
+    def test_save_and_load(self):
+        take_snapshot(self.aws_credentials, include_roles=False).save(self.snapshot_path)
+        self.assertEqual(0, self.backend.call_counts['ListRoles'])
+        snapshot = AccountSnapshot.load(self.snapshot_path)
+        self.assertEqual(120, len(snapshot.functions))
+        self.assertEqual({}, snapshot.roles)
+
+        with open(self.snapshot_path, 'r') as f:
+            data = json.load(f)
+        data['version'] = 0
+        with open(self.snapshot_path, 'w') as f:
+            json.dump(data, f)
+        with self.assertRaises(Exception):
+            AccountSnapshot.load(self.snapshot_path)
+
+    def test_helpers_answer_from_snapshot(self):
+        snapshot = take_snapshot(self.aws_credentials)
+        calls = self.backend.total_calls()
+        with patch('builtins.print') as _:
+            self.assertEqual(1, check_lambda_exists('function_7', self.aws_credentials, snapshot=snapshot))
+            self.assertEqual(0, check_lambda_exists('missing', self.aws_credentials, snapshot=snapshot))
+            self.assertDictEqual({'function_1': 1, 'missing': 0},
+                                 check_lambda_exists_batch(['function_1', 'missing'], self.aws_credentials,
+                                                           snapshot=snapshot))
+            self.assertEqual(self.role_arn, get_iam_role_arn('Lambda_Role', self.aws_credentials, snapshot=snapshot))
+            self.assertEqual(self.backend.layer_arn('requests', 3),
+                             get_lambda_layer_latest_version('requests', self.aws_credentials, snapshot=snapshot)[0])
+        self.assertEqual(calls, self.backend.total_calls())
+
+    def test_lookup_of_what_the_snapshot_misses(self):
+        snapshot = take_snapshot(self.aws_credentials)
+        self.backend.add_layer('published_later', versions=1)
+        with patch('builtins.print') as _:
+            layer_arns, role_arns = resolve_lookups(['requests', 'published_later'], ['Lambda_Role'],
+                                                    self.aws_credentials, snapshot=snapshot)
+        self.assertEqual(self.backend.layer_arn('published_later', 1), layer_arns['published_later'])
+        self.assertEqual(self.role_arn, role_arns['Lambda_Role'])
+        self.assertEqual(1, self.backend.call_counts['ListLayerVersions'])
+        self.assertEqual(0, self.backend.call_counts['GetRole'])
+
+    def test_command(self):
+        output_path = os.path.join(self.temp_dir.name, 'exists.json')
+        with patch('builtins.print') as _:
+            self.assertEqual(0, main(['snapshot', '--access', '123', '--secret', 'abc', '--output',
+                                      self.snapshot_path]))
+            calls = self.backend.total_calls()
+            self.assertEqual(0, main(['batch', '--functions', 'function_3', 'missing', '--snapshot',
+                                      self.snapshot_path, '--output', output_path]))
+        self.assertEqual(calls, self.backend.total_calls())
+        with open(output_path, 'r') as f:
+            self.assertEqual({'function_3': 1, 'missing': 0}, json.load(f))
+
+    def test_snapshot_of_another_region(self):
+        other_region = dict(self.aws_credentials, region='us-west-2')
+        with patch('builtins.print') as _:
+            take_snapshot(self.aws_credentials).save(self.snapshot_path)
+            snapshot = AccountSnapshot.load(self.snapshot_path)
+            snapshot.check_region(self.aws_credentials)
+            with self.assertRaises(Exception) as context:
+                snapshot.check_region(other_region)
+            self.assertIn('The snapshot was taken in us-east-2, not in us-west-2', str(context.exception))
+
+            # the commands do not answer from it either
+            output_path = os.path.join(self.temp_dir.name, 'exists.txt')
+            self.assertEqual(1, main(['exists', '--function', 'other_region_function', '--snapshot',
+                                      self.snapshot_path, '--access', '123', '--secret', 'abc', '--region',
+                                      'us-west-2', '--output', output_path]))
+            self.assertFalse(os.path.exists(output_path))
+            output_path = os.path.join(self.temp_dir.name, 'function.json')
+            self.assertEqual(1, main(['deployment-json', '--function', 'other_region_function', '--handler',
+                                      'main.handler', '--runtime', 'python3.8', '--role', 'Lambda_Role', '--layers',
+                                      'requests', '--snapshot', self.snapshot_path, '--access', '123', '--secret',
+                                      'abc', '--region', 'us-west-2', '--output', output_path]))
+            self.assertFalse(os.path.exists(output_path))
+
+            # with --regions it still answers for its own region
+            self.backend.add_layer('requests', versions=1, region='us-west-2')
+            self.assertEqual(0, main(['deployment-json', '--function', 'other_region_function', '--handler',
+                                      'main.handler', '--runtime', 'python3.8', '--role', 'Lambda_Role', '--layers',
+                                      'requests', '--snapshot', self.snapshot_path, '--access', '123', '--secret',
+                                      'abc', '--regions', 'us-east-2', 'us-west-2', '--output', output_path]))
+        with open(os.path.join(self.temp_dir.name, 'function.us-west-2.json'), 'r') as f:
+            self.assertEqual([self.backend.layer_arn('requests', 1, region='us-west-2')], json.load(f)['Layers'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+from src.async_lookups import AsyncLookups
+from src.fake_aws import FakeAWSBackend
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.aws_credentials = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'us-east-2'}
+        self.backend = FakeAWSBackend().install()
+        for index in range(20):
+            self.backend.add_function(f'function_{index}')
+        self.backend.add_layer('requests', versions=2)
+        self.role_arn = self.backend.add_role('Lambda_Role')
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self) -> None:
+        self.loop.close()
+        self.backend.uninstall()
+
+    def test_same_values_as_sync(self):
+        async def lookups():
+            async with AsyncLookups(self.aws_credentials) as async_lookups:
+                return await asyncio.gather(async_lookups.check_lambda_exists('function_1'),
+                                            async_lookups.check_lambda_exists('missing'),
+                                            async_lookups.get_iam_role_arn('Lambda_Role'),
+                                            async_lookups.get_iam_role_arn('Missing_Role'),
+                                            async_lookups.get_lambda_layer_latest_version('requests'))
+
+        with patch('builtins.print') as _:
+            exists, missing, role_arn, missing_role_arn, (layer_arn, _) = self.loop.run_until_complete(lookups())
+        self.assertEqual(1, exists)
+        self.assertEqual(0, missing)
+        self.assertEqual(self.role_arn, role_arn)
+        self.assertEqual('', missing_role_arn)
+        self.assertEqual(self.backend.layer_arn('requests', 2), layer_arn)
+
+    def test_bounded_concurrency(self):
+        self.backend.latency = 0.05
+
+        async def lookups():
+            async with AsyncLookups(self.aws_credentials, max_concurrency=5) as async_lookups:
+                return await asyncio.gather(*[async_lookups.check_lambda_exists(f'function_{index}')
+                                              for index in range(20)])
+
+        start = time.perf_counter()
+        with patch('builtins.print') as _:
+            results = self.loop.run_until_complete(lookups())
+        duration = time.perf_counter() - start
+        self.assertEqual([1] * 20, results)
+        # 20 calls of 50 ms, 5 at a time
+        self.assertGreaterEqual(duration, 0.2)
+        self.assertLess(duration, 0.6)
+
+    def test_cancellation(self):
+        self.backend.latency = 0.1
+
+        async def lookups():
+            async_lookups = AsyncLookups(self.aws_credentials, max_concurrency=1)
+            tasks = [asyncio.ensure_future(async_lookups.check_lambda_exists(f'function_{index}'))
+                     for index in range(5)]
+            await asyncio.sleep(0.02)
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            async_lookups.close()
+            return results
+
+        with patch('builtins.print') as _:
+            results = self.loop.run_until_complete(lookups())
+        self.assertTrue(all(isinstance(result, asyncio.CancelledError) for result in results))
+        time.sleep(0.15)
+        # only the call already running on the pool reached the backend
+        self.assertEqual(1, self.backend.call_counts['GetFunction'])
+
+    def test_create_json(self):
+        async def create():
+            async with AsyncLookups(self.aws_credentials) as async_lookups:
+                return await async_lookups.create_json(function_name='function_1', runtime='python3.7',
+                                                       role_name='Lambda_Role', handler='main.handler',
+                                                       description=None, layer_names=['requests'], timeout=30)
+
+        async def create_missing():
+            async with AsyncLookups(self.aws_credentials) as async_lookups:
+                return await async_lookups.create_json(function_name='function_1', runtime='python3.7',
+                                                       role_name='Lambda_Role', handler='main.handler',
+                                                       description=None, layer_names=['missing'])
+
+        with patch('builtins.print') as _:
+            payload = self.loop.run_until_complete(create())
+            with self.assertRaises(Exception) as context:
+                self.loop.run_until_complete(create_missing())
+        self.assertEqual(self.role_arn, payload['Role'])
+        self.assertEqual([self.backend.layer_arn('requests', 2)], payload['Layers'])
+        self.assertEqual(30, payload['Timeout'])
+        self.assertIn('missing', str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
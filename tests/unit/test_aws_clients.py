@@ -0,0 +1,159 @@
+import argparse
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from src import aws_clients
+from src.aws_clients import get_client, clear_clients, call_with_retry, paginate_with_retry, set_rate_limit, \
+    get_rate_limiter, credentials_from_args, TokenBucket, THROTTLED_RATE_LIMIT
+from src.fake_aws import FakeAWSBackend
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.aws_credentials = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'us-east-2'}
+        clear_clients()
+
+    def tearDown(self) -> None:
+        clear_clients()
+        set_rate_limit(None)
+
+    def test_get_client_memoized(self):
+        with patch('boto3.client') as client_mock:
+            first = get_client('lambda', self.aws_credentials)
+            second = get_client('lambda', self.aws_credentials)
+            self.assertIs(first, second)
+            self.assertEqual(1, client_mock.call_count)
+
+    def test_get_client_memoized_across_threads(self):
+        with patch('boto3.client') as client_mock:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                clients = list(executor.map(lambda _: get_client('iam', self.aws_credentials), range(32)))
+            self.assertEqual(1, len(set(id(client) for client in clients)))
+            self.assertEqual(1, client_mock.call_count)
+
+    def test_get_client_keys(self):
+        other_region = dict(self.aws_credentials, region='us-west-1')
+        with patch('boto3.client') as client_mock:
+            get_client('lambda', self.aws_credentials)
+            get_client('iam', self.aws_credentials)
+            get_client('lambda', other_region)
+            get_client('lambda', None)
+            get_client('lambda', self.aws_credentials, max_pool_connections=50)
+            self.assertEqual(5, client_mock.call_count)
+
+    def test_get_client_config(self):
+        client = get_client('lambda', self.aws_credentials, max_pool_connections=50, max_attempts=7,
+                            retry_mode='standard')
+        self.assertEqual(50, client.meta.config.max_pool_connections)
+        self.assertEqual('standard', client.meta.config.retries['mode'])
+        self.assertEqual(7, client.meta.config.retries['total_max_attempts'])
+        self.assertEqual('us-east-2', client.meta.region_name)
+        # botocore does not retry on its own, call_with_retry does
+        client = get_client('lambda', self.aws_credentials)
+        self.assertEqual(1, client.meta.config.retries['total_max_attempts'])
+
+    def test_credentials_from_args(self):
+        args = argparse.Namespace(access='123', secret='abc', region='us-east-2')
+        self.assertDictEqual(self.aws_credentials, credentials_from_args(args))
+        self.assertIsNone(credentials_from_args(argparse.Namespace(access='123', secret=None, region='us-east-2')))
+
+    def test_parse_rate_limit(self):
+        for value in [None, '', 'none', 'None', '0', '-5', 'abc']:
+            self.assertIsNone(aws_clients._parse_rate_limit(value))
+        self.assertEqual(25.0, aws_clients._parse_rate_limit('25'))
+
+    def test_call_with_retry_throttled(self):
+        with FakeAWSBackend(throttle_rate=0.2, seed=1) as backend, \
+                patch('src.aws_clients.THROTTLED_RATE_LIMIT', 1000.0), patch('src.aws_clients.BASE_DELAY', 0.001):
+            backend.add_function('data_domotz_api')
+            client = get_client('lambda', self.aws_credentials)
+            for _ in range(20):
+                response = call_with_retry(client, 'get_function', self.aws_credentials,
+                                           FunctionName='data_domotz_api')
+                self.assertEqual('data_domotz_api', response['Configuration']['FunctionName'])
+            throttles = backend.throttle_counts['GetFunction']
+            self.assertGreater(throttles, 0)
+            self.assertEqual(20 + throttles, backend.call_counts['GetFunction'])
+            # the shared bucket of the credentials started limiting after the first throttle
+            self.assertIsNotNone(get_rate_limiter(self.aws_credentials).rate)
+
+    def test_call_with_retry_gives_up(self):
+        with FakeAWSBackend(throttle_rate=1.0) as backend, patch('src.aws_clients.THROTTLED_RATE_LIMIT', 1000.0), \
+                patch('src.aws_clients.BASE_DELAY', 0.001):
+            backend.add_function('data_domotz_api')
+            client = get_client('lambda', self.aws_credentials)
+            with self.assertRaises(Exception) as context:
+                call_with_retry(client, 'get_function', self.aws_credentials, FunctionName='data_domotz_api')
+            self.assertIn('ThrottlingException', str(context.exception))
+            self.assertEqual(aws_clients.MAX_ATTEMPTS, backend.call_counts['GetFunction'])
+
+    def test_call_with_retry_connection_errors(self):
+        with FakeAWSBackend() as backend, patch('src.aws_clients.BASE_DELAY', 0.001):
+            backend.add_function('data_domotz_api')
+            backend.connection_failures['GetFunction'] = 2
+            client = get_client('lambda', self.aws_credentials)
+            response = call_with_retry(client, 'get_function', self.aws_credentials, FunctionName='data_domotz_api')
+            self.assertEqual('data_domotz_api', response['Configuration']['FunctionName'])
+            self.assertEqual(3, backend.call_counts['GetFunction'])
+            # network failures do not slow down the shared rate limit
+            self.assertIsNone(get_rate_limiter(self.aws_credentials).rate)
+
+            backend.connection_failures['GetFunction'] = aws_clients.MAX_ATTEMPTS
+            with self.assertRaises(Exception) as context:
+                call_with_retry(client, 'get_function', self.aws_credentials, FunctionName='data_domotz_api')
+            self.assertIn('Could not connect', str(context.exception))
+            self.assertEqual(3 + aws_clients.MAX_ATTEMPTS, backend.call_counts['GetFunction'])
+
+    def test_call_with_retry_other_errors(self):
+        with FakeAWSBackend() as backend:
+            client = get_client('lambda', self.aws_credentials)
+            with self.assertRaises(Exception) as context:
+                call_with_retry(client, 'get_function', self.aws_credentials, FunctionName='missing')
+            self.assertIn('ResourceNotFoundException', str(context.exception))
+            self.assertEqual(1, backend.call_counts['GetFunction'])
+
+    def test_token_bucket(self):
+        bucket = TokenBucket()
+        with patch('src.aws_clients.time.sleep') as sleep_mock:
+            for _ in range(100):
+                bucket.acquire()
+            sleep_mock.assert_not_called()
+            bucket.throttled()
+            self.assertEqual(THROTTLED_RATE_LIMIT, bucket.rate)
+            bucket.throttled()
+            self.assertAlmostEqual(THROTTLED_RATE_LIMIT * 0.7, bucket.rate)
+            bucket.acquire()
+            self.assertTrue(sleep_mock.called)
+        for _ in range(200):
+            bucket.succeeded()
+        self.assertIsNone(bucket.rate)
+
+        bucket = TokenBucket(5.0)
+        bucket.throttled()
+        self.assertAlmostEqual(3.5, bucket.rate)
+        for _ in range(200):
+            bucket.succeeded()
+        self.assertEqual(5.0, bucket.rate)
+
+    def test_rate_limiter_shared(self):
+        set_rate_limit(5.0)
+        bucket = get_rate_limiter(self.aws_credentials)
+        self.assertIs(bucket, get_rate_limiter(dict(self.aws_credentials)))
+        self.assertIsNot(bucket, get_rate_limiter(dict(self.aws_credentials, region='us-west-1')))
+        self.assertEqual(5.0, bucket.rate)
+
+    def test_paginate_with_retry(self):
+        client = MagicMock()
+        client.list_roles.side_effect = [
+            {'Roles': [{'RoleName': 'a'}], 'IsTruncated': True, 'Marker': 'page2'},
+            {'Roles': [{'RoleName': 'b'}], 'IsTruncated': False}
+        ]
+        roles = list(paginate_with_retry(client, 'list_roles', 'Roles', self.aws_credentials))
+        self.assertEqual(['a', 'b'], [role['RoleName'] for role in roles])
+        # a MagicMock marker (or an empty page) ends the pagination
+        client = MagicMock()
+        self.assertEqual([], list(paginate_with_retry(client, 'list_functions', 'Functions')))
+
+
+if __name__ == '__main__':
+    unittest.main()
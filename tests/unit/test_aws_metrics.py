@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src import aws_metrics
+from src.create_lambda_deployment_json import get_iam_role_arn, get_lambda_layer_latest_version
+from src.fake_aws import FakeAWSBackend
+from src.lookup_cache import LookupCache
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.aws_credentials = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'us-east-2'}
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.backend = FakeAWSBackend().install()
+        self.backend.add_layer('requests', versions=2)
+
+    def tearDown(self) -> None:
+        aws_metrics.disable()
+        self.backend.uninstall()
+        self.temp_dir.cleanup()
+
+    def test_disabled_records_nothing(self):
+        with patch('builtins.print') as _:
+            get_lambda_layer_latest_version('requests', self.aws_credentials)
+        self.assertEqual([], aws_metrics.events())
+
+    def test_events(self):
+        output_path = os.path.join(self.temp_dir.name, 'profile.jsonl')
+        aws_metrics.enable(output_path=output_path, summary_at_exit=False)
+        cache = LookupCache(cache_dir=self.temp_dir.name)
+        with patch('builtins.print') as _:
+            for _ in range(2):
+                get_lambda_layer_latest_version('requests', self.aws_credentials, cache=cache)
+            get_iam_role_arn('Incorrect_Lambda_Role', self.aws_credentials)
+
+        events = aws_metrics.events()
+        self.assertEqual(['lambda', 'iam'], [event['name'] for event in events if event['event'] == 'client'])
+        calls = [event for event in events if event['event'] == 'call']
+        self.assertEqual([200, 404], [event['http_status'] for event in calls])
+        self.assertEqual([None, 'NoSuchEntity'], [event.get('error') for event in calls])
+        self.assertEqual([False, True], [event['hit'] for event in events if event['event'] == 'cache'])
+        with open(output_path) as f:
+            self.assertEqual(len(events), len([json.loads(line) for line in f]))
+
+        summary = aws_metrics.summary()
+        self.assertIn('list_layer_versions', summary)
+        self.assertIn('layer', summary)
+
+    def test_retries_recorded(self):
+        aws_metrics.enable(summary_at_exit=False)
+        self.backend.throttle_rate = 1.0
+        with patch('builtins.print') as _, patch('src.aws_clients.BASE_DELAY', 0.001), \
+                patch('src.aws_clients.THROTTLED_RATE_LIMIT', 1000.0):
+            layer_arn, _ = get_lambda_layer_latest_version('requests', self.aws_credentials)
+        self.assertEqual('', layer_arn)
+        call = [event for event in aws_metrics.events() if event['event'] == 'call'][0]
+        self.assertEqual(5, call['retries'])
+        self.assertEqual(429, call['http_status'])
+
+
+if __name__ == '__main__':
+    unittest.main()
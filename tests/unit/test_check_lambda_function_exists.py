@@ -1,7 +1,8 @@
 import unittest
 import os
-from unittest.mock import patch
-from src.check_lambda_function_exists import check_lambda_exists
+from unittest.mock import patch, MagicMock
+from src.aws_clients import clear_clients
+from src.check_lambda_function_exists import check_lambda_exists, check_lambda_exists_batch
 
 
 class MyTestCase(unittest.TestCase):
@@ -12,6 +13,7 @@ class MyTestCase(unittest.TestCase):
             'region': 'us-east-2'
         }
         self.aws_credentials_incorrect = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'mars-trinity-1'}
+        clear_clients()
 
     def test_check_lambda_exists_correct(self):
         correct_value = 1
@@ -34,3 +36,41 @@ class MyTestCase(unittest.TestCase):
             response = check_lambda_exists(function_name=function_name, credentials=self.aws_credentials_incorrect)
             self.assertEqual(correct_value, response)
 
+    def test_check_lambda_exists_batch(self):
+        def get_function(FunctionName):
+            if FunctionName == 'missing_function':
+                raise Exception('An error occurred (ResourceNotFoundException) when calling the GetFunction operation')
+            if FunctionName == 'broken_function':
+                raise Exception('An error occurred (AccessDeniedException) when calling the GetFunction operation')
+            return {'Configuration': {'FunctionName': FunctionName}}
+
+        client = MagicMock()
+        client.get_function.side_effect = get_function
+        function_names = ['data_domotz_api', 'missing_function', 'broken_function', 'data_domotz_api']
+        with patch('builtins.print') as _, patch('boto3.client') as client_mock:
+            client_mock.return_value = client
+            response = check_lambda_exists_batch(function_names=function_names, credentials=self.aws_credentials,
+                                                 max_workers=2)
+            self.assertDictEqual({'data_domotz_api': 1, 'missing_function': 0, 'broken_function': -1}, response)
+            self.assertEqual(1, client_mock.call_count)
+            self.assertEqual(3, client.get_function.call_count)
+
+    def test_check_lambda_exists_batch_listing(self):
+        client = MagicMock()
+        client.list_functions.side_effect = [
+            {'Functions': [{'FunctionName': 'data_domotz_api'}], 'NextMarker': 'page2'},
+            {'Functions': [{'FunctionName': 'other_function'}]}
+        ]
+        with patch('builtins.print') as _, patch('boto3.client') as client_mock:
+            client_mock.return_value = client
+            response = check_lambda_exists_batch(function_names=['other_function', 'missing_function'],
+                                                 credentials=self.aws_credentials, use_listing=True)
+            self.assertDictEqual({'other_function': 1, 'missing_function': 0}, response)
+            client.get_function.assert_not_called()
+            client.list_functions.assert_called_with(Marker='page2')
+
+    def test_check_lambda_exists_batch_incorrect_credentials(self):
+        with patch('builtins.print') as _:
+            response = check_lambda_exists_batch(function_names=['data_domotz_api'],
+                                                 credentials=self.aws_credentials_incorrect, use_listing=True)
+            self.assertDictEqual({'data_domotz_api': -1}, response)
@@ -1,7 +1,10 @@
 import os
 import unittest
-from unittest.mock import patch
-from src.create_lambda_deployment_json import get_iam_role_arn, get_lambda_layer_latest_version, create_json
+from unittest.mock import patch, MagicMock
+from src.aws_clients import clear_clients
+from src.create_lambda_deployment_json import get_iam_role_arn, get_lambda_layer_latest_version, create_json, \
+    resolve_layers_and_role, resolve_region_lookups, region_output_path
+from src.fake_aws import FakeAWSBackend
 
 
 class MyTestCase(unittest.TestCase):
@@ -12,6 +15,7 @@ class MyTestCase(unittest.TestCase):
             'region': 'us-east-2'
         }
         self.aws_credentials_incorrect = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'mars-trinity-1'}
+        clear_clients()
 
     def test_get_iam_role_arn_correct_role(self):
         role_name = 'Data_Lambda_Full_Access'
@@ -110,3 +114,73 @@ class MyTestCase(unittest.TestCase):
                                     lambda_layers=["arn:aws:lambda:us-east-2:157648923453:layer:requests:13",
                                                    "arn:aws:lambda:us-east-2:157648923453:layer:jsonschema:3"])
             self.assertEqual({}, json_body)
+
+    @staticmethod
+    def _mock_boto3_client(client_mock, layer_versions: dict, roles: dict):
+        def list_layer_versions(LayerName, MaxItems):
+            if LayerName not in layer_versions:
+                raise Exception('An error occurred (ResourceNotFoundException)')
+            return {'ResponseMetadata': {'HTTPStatusCode': 200},
+                    'LayerVersions': [{'LayerVersionArn': layer_versions[LayerName]}]}
+
+        def get_role(RoleName):
+            if RoleName not in roles:
+                raise Exception('An error occurred (NoSuchEntity)')
+            return {'Role': {'Arn': roles[RoleName]}}
+
+        lambda_client, iam_client = MagicMock(), MagicMock()
+        lambda_client.list_layer_versions.side_effect = list_layer_versions
+        iam_client.get_role.side_effect = get_role
+        client_mock.side_effect = lambda service, **kwargs: lambda_client if service == 'lambda' else iam_client
+
+    def test_resolve_layers_and_role(self):
+        layer_versions = {
+            'requests': 'arn:aws:lambda:us-east-2:157648923453:layer:requests:14',
+            'jsonschema': 'arn:aws:lambda:us-east-2:157648923453:layer:jsonschema:4'
+        }
+        roles = {'Data_Lambda_Full_Access': 'arn:aws:iam::157648923453:role/Data_Lambda_Full_Access'}
+        with patch('builtins.print') as _, patch('boto3.client') as client_mock:
+            self._mock_boto3_client(client_mock, layer_versions, roles)
+            layer_arns, role_arn = resolve_layers_and_role(layer_names=['jsonschema', 'requests'],
+                                                           role_name='Data_Lambda_Full_Access',
+                                                           credentials=self.aws_credentials)
+            self.assertListEqual([layer_versions['jsonschema'], layer_versions['requests']], layer_arns)
+            self.assertEqual(roles['Data_Lambda_Full_Access'], role_arn)
+
+    def test_resolve_layers_and_role_missing(self):
+        layer_versions = {'requests': 'arn:aws:lambda:us-east-2:157648923453:layer:requests:14'}
+        with patch('builtins.print') as _, patch('boto3.client') as client_mock:
+            self._mock_boto3_client(client_mock, layer_versions, {})
+            with self.assertRaises(Exception) as context:
+                resolve_layers_and_role(layer_names=['missingA', 'requests', 'missingB'],
+                                        role_name='Incorrect_Lambda_Role', credentials=self.aws_credentials)
+            message = str(context.exception)
+            for name in ['missingA', 'missingB', 'Incorrect_Lambda_Role']:
+                self.assertIn(name, message)
+            self.assertNotIn('layer requests', message)
+
+    def test_resolve_region_lookups(self):
+        regions = ['us-east-1', 'us-east-2', 'eu-west-1']
+        credentials = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'us-east-2'}
+        with FakeAWSBackend() as backend, patch('builtins.print') as _:
+            for position, region in enumerate(regions):
+                backend.add_layer('requests', versions=position + 1, region=region)
+            role_arn = backend.add_role('Lambda_Role')
+            layer_arns, role_arns = resolve_region_lookups(layer_names=['requests'], role_names=['Lambda_Role'],
+                                                           regions=regions, credentials=credentials)
+            self.assertDictEqual({region: {'requests': backend.layer_arn('requests', position + 1, region)}
+                                  for position, region in enumerate(regions)}, layer_arns)
+            self.assertDictEqual({'Lambda_Role': role_arn}, role_arns)
+            self.assertEqual(1, backend.call_counts['GetRole'])
+            self.assertEqual(3, backend.call_counts['ListLayerVersions'])
+
+            with self.assertRaises(Exception) as context:
+                resolve_region_lookups(layer_names=['requests'], role_names=['Lambda_Role'],
+                                       regions=['us-east-2', 'ap-south-1'], credentials=credentials)
+            self.assertIn('ap-south-1: The layer requests could not be found', str(context.exception))
+            self.assertNotIn('us-east-2:', str(context.exception))
+
+    def test_region_output_path(self):
+        self.assertEqual('lambda_config.us-east-1.json', region_output_path('lambda_config.json', 'us-east-1'))
+        self.assertEqual(os.path.join('configs', 'lambda.eu-west-1.json'),
+                         region_output_path(os.path.join('configs', 'lambda'), 'eu-west-1'))
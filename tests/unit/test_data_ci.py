@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.data_ci import main
+from src.fake_aws import FakeAWSBackend
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.backend = FakeAWSBackend().install()
+        self.backend.add_function('data_domotz_api')
+        # a helper daemon running on this machine would not see the fake backend
+        self.no_daemon = patch.dict(os.environ, {'DATA_CI_DAEMON_SOCKET': ''})
+        self.no_daemon.start()
+
+    def tearDown(self) -> None:
+        self.no_daemon.stop()
+        self.backend.uninstall()
+        self.temp_dir.cleanup()
+
+    def _args(self, command: str, output: str, *args) -> list:
+        return [command, *args, '--access', '123', '--secret', 'abc', '--output',
+                os.path.join(self.temp_dir.name, output)]
+
+    def _import_time(self, module: str) -> tuple:
+        """
+        :return: The median seconds the import of the module takes in a fresh interpreter, and the boto3 and botocore
+        modules it loaded
+        """
+        script = ('import json, sys, time\n'
+                  'start = time.perf_counter()\n'
+                  f'import {module}\n'
+                  'duration = time.perf_counter() - start\n'
+                  'print(json.dumps([duration, sorted(m for m in sys.modules if m.split(".")[0] in '
+                  '("boto3", "botocore"))]))')
+        durations = []
+        for _ in range(3):
+            output = subprocess.run([sys.executable, '-W', 'ignore', '-c', script], cwd=REPOSITORY_ROOT, check=True,
+                                    stdout=subprocess.PIPE).stdout
+            duration, aws_modules = json.loads(output.decode().splitlines()[-1])
+            durations.append(duration)
+        return sorted(durations)[1], aws_modules
+
+    def test_import_budget(self):
+        duration, aws_modules = self._import_time('src.data_ci')
+        self.assertEqual([], aws_modules)
+        # the budget is half of the import of boto3 alone on the same machine: the CLI takes about a quarter of it,
+        # and importing boto3 eagerly again takes at least all of it
+        boto3_duration, _ = self._import_time('boto3')
+        self.assertLess(duration, boto3_duration / 2)
+
+    def test_exists(self):
+        with patch('builtins.print') as _:
+            self.assertEqual(0, main(self._args('exists', 'exists.txt', '--function', 'data_domotz_api')))
+        with open(os.path.join(self.temp_dir.name, 'exists.txt'), 'r') as f:
+            self.assertEqual('1', f.read())
+
+    def test_batch(self):
+        with patch('builtins.print') as _:
+            self.assertEqual(0, main(self._args('batch', 'exists.json', '--functions', 'data_domotz_api', 'missing')))
+        with open(os.path.join(self.temp_dir.name, 'exists.json'), 'r') as f:
+            self.assertEqual({'data_domotz_api': 1, 'missing': 0}, json.load(f))
+
+    def test_deployment_json_without_aws(self):
+        with patch('builtins.print') as _, patch('src.create_lambda_deployment_json.get_client') as get_client_mock:
+            self.assertEqual(0, main(self._args('deployment-json', 'function.json', '--function', 'data_domotz_api',
+                                                '--handler', 'main.handler', '--runtime', 'python3.8', '--role-arn',
+                                                'arn:aws:iam::123456789012:role/Lambda_Role', '--layer-arns',
+                                                'arn:aws:lambda:us-east-2:123456789012:layer:requests:2')))
+            get_client_mock.assert_not_called()
+        with open(os.path.join(self.temp_dir.name, 'function.json'), 'r') as f:
+            payload = json.load(f)
+        self.assertEqual('arn:aws:iam::123456789012:role/Lambda_Role', payload['Role'])
+        self.assertEqual(['arn:aws:lambda:us-east-2:123456789012:layer:requests:2'], payload['Layers'])
+
+    def test_deployment_json_regions(self):
+        for region in ['us-east-1', 'us-west-2']:
+            self.backend.add_layer('requests', versions=2, region=region)
+        self.backend.add_role('Lambda_Role')
+        with patch('builtins.print') as _:
+            self.assertEqual(0, main(self._args('deployment-json', 'function.json', '--function', 'data_domotz_api',
+                                                '--handler', 'main.handler', '--runtime', 'python3.8', '--role',
+                                                'Lambda_Role', '--layers', 'requests', '--regions', 'us-east-1',
+                                                'us-west-2')))
+        for region in ['us-east-1', 'us-west-2']:
+            with open(os.path.join(self.temp_dir.name, f'function.{region}.json'), 'r') as f:
+                self.assertEqual([self.backend.layer_arn('requests', 2, region)], json.load(f)['Layers'])
+        self.assertEqual(1, self.backend.call_counts['GetRole'])
+
+    def test_missing_arguments(self):
+        with patch('sys.stderr') as _, self.assertRaises(SystemExit):
+            main(['deployment-json', '--function', 'data_domotz_api'])
+        with patch('sys.stderr') as _, self.assertRaises(SystemExit):
+            main(['exists', '--functions', 'data_domotz_api'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from src.aws_clients import clear_clients
+from src.create_lambda_deployment_json import create_json
+from src.deployment_diff import payload_hash, save_state, detect_changes, compare_with_live, write_change_list, \
+    commit_state, pending_state_path, NEW, CHANGED, UNCHANGED
+from src.deployment_manifest import build_manifest
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.aws_credentials = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'us-east-2'}
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.temp_dir.name, 'state.json')
+        with patch('builtins.print') as _:
+            self.payload = create_json(function_name='testFunc', runtime='python3.7',
+                                       role='arn:aws:iam::157648923453:role/Data_Lambda_Full_Access',
+                                       handler='modulename.function_handler', description='dummy description',
+                                       timeout=60, memory_size=256,
+                                       lambda_layers=['arn:aws:lambda:us-east-2:157648923453:layer:requests:13'],
+                                       tags={'team': 'data'}, vpc_subnets=['subnet2', 'subnet1'],
+                                       vpc_security_groups=['sg1'])
+        self.live_response = {
+            'Configuration': {
+                'FunctionName': 'testFunc', 'Runtime': 'python3.7',
+                'Role': 'arn:aws:iam::157648923453:role/Data_Lambda_Full_Access',
+                'Handler': 'modulename.function_handler', 'Description': 'dummy description', 'Timeout': 60,
+                'MemorySize': 256, 'CodeSha256': 'abc',
+                'Layers': [{'Arn': 'arn:aws:lambda:us-east-2:157648923453:layer:requests:13', 'CodeSize': 10}],
+                'VpcConfig': {'SubnetIds': ['subnet1', 'subnet2'], 'SecurityGroupIds': ['sg1'], 'VpcId': 'vpc1'}
+            },
+            'Tags': {'team': 'data', 'aws:cloudformation:stack-name': 'stack'}
+        }
+        clear_clients()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        clear_clients()
+
+    def test_payload_hash(self):
+        reordered = dict(reversed(list(self.payload.items())))
+        self.assertEqual(payload_hash(self.payload), payload_hash(reordered))
+        self.assertNotEqual(payload_hash(self.payload), payload_hash(dict(self.payload, Timeout=61)))
+
+    def test_detect_changes_state_file(self):
+        other = dict(self.payload, FunctionName='otherFunc')
+        save_state(self.state_file, {'testFunc': self.payload, 'otherFunc': other})
+        changes = detect_changes({'testFunc': self.payload, 'otherFunc': dict(other, MemorySize=512),
+                                  'newFunc': self.payload}, state_file=self.state_file)
+        self.assertDictEqual({'testFunc': UNCHANGED, 'otherFunc': CHANGED, 'newFunc': NEW}, changes)
+
+        changes_output = os.path.join(self.temp_dir.name, 'changes.json')
+        write_change_list(changes_output, changes)
+        with open(changes_output) as f:
+            change_list = json.load(f)
+        self.assertEqual(['otherFunc', 'newFunc'], change_list['changed'])
+        self.assertEqual(['testFunc'], change_list['unchanged'])
+
+    def test_compare_with_live(self):
+        client = MagicMock()
+        client.get_function.return_value = self.live_response
+        with patch('builtins.print') as _:
+            self.assertEqual(UNCHANGED, compare_with_live(self.payload, aws_client=client))
+            self.assertEqual(CHANGED, compare_with_live(dict(self.payload, Handler='other.handler'),
+                                                        aws_client=client))
+            client.get_function.side_effect = Exception('An error occurred (ResourceNotFoundException)')
+            self.assertEqual(NEW, compare_with_live(self.payload, aws_client=client))
+            client.get_function.side_effect = Exception('An error occurred (AccessDeniedException)')
+            self.assertEqual(CHANGED, compare_with_live(self.payload, aws_client=client))
+
+    def test_build_manifest_changed_only(self):
+        manifest = {
+            'defaults': {'runtime': 'python3.7', 'role': 'Data_Lambda_Full_Access'},
+            'functions': [{'function': 'func_a', 'handler': 'module_a.handler'},
+                          {'function': 'func_b', 'handler': 'module_b.handler'}]
+        }
+        client = MagicMock()
+        client.get_role.return_value = {'Role': {'Arn': 'arn:aws:iam::157648923453:role/Data_Lambda_Full_Access'}}
+        with patch('builtins.print') as _, patch('boto3.client') as client_mock:
+            client_mock.return_value = client
+            written = build_manifest(manifest, credentials=self.aws_credentials, output_dir=self.temp_dir.name,
+                                     changed_only=True, state_file=self.state_file)
+            self.assertEqual(['func_a', 'func_b'], list(written))
+            # not committed yet (eg. the deploy failed): everything is still new
+            written = build_manifest(manifest, credentials=self.aws_credentials, output_dir=self.temp_dir.name,
+                                     changed_only=True, state_file=self.state_file)
+            self.assertEqual(['func_a', 'func_b'], list(written))
+            self.assertEqual(['func_a', 'func_b'], commit_state(self.state_file))
+            self.assertFalse(os.path.exists(pending_state_path(self.state_file)))
+            manifest['functions'][1]['memory'] = 512
+            changes_output = os.path.join(self.temp_dir.name, 'changes.json')
+            written = build_manifest(manifest, credentials=self.aws_credentials, output_dir=self.temp_dir.name,
+                                     changed_only=True, state_file=self.state_file, changes_output=changes_output)
+            self.assertEqual(['func_b'], list(written))
+        with open(changes_output) as f:
+            self.assertEqual(['func_b'], json.load(f)['changed'])
+
+    def test_commit_state_partial(self):
+        save_state(pending_state_path(self.state_file), {'testFunc': self.payload,
+                                                         'otherFunc': dict(self.payload, FunctionName='otherFunc')})
+        self.assertEqual(['testFunc'], commit_state(self.state_file, ['testFunc', 'missingFunc']))
+        self.assertEqual({'testFunc': UNCHANGED},
+                         detect_changes({'testFunc': self.payload}, state_file=self.state_file))
+        self.assertEqual({'otherFunc': NEW}, detect_changes({'otherFunc': self.payload}, state_file=self.state_file))
+        self.assertTrue(os.path.exists(pending_state_path(self.state_file)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from src.aws_clients import clear_clients
+from src.deployment_manifest import load_manifest, expand_manifest, build_manifest
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.aws_credentials = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'us-east-2'}
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manifest = {
+            'defaults': {
+                'runtime': 'python3.7',
+                'role': 'Data_Lambda_Full_Access',
+                'layers': ['requests', 'jsonschema'],
+                'tags': {'team': 'data'},
+                'timeout': 60
+            },
+            'functions': [
+                {'function': 'func_a', 'handler': 'module_a.handler', 'tags': {'owner': 'a'}},
+                {'function': 'func_b', 'handler': 'module_b.handler', 'layers': ['requests'], 'memory': 256,
+                 'output': os.path.join(self.temp_dir.name, 'custom.json')}
+            ]
+        }
+        clear_clients()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        clear_clients()
+
+    def test_expand_manifest(self):
+        specs = expand_manifest(self.manifest)
+        self.assertEqual(['func_a', 'func_b'], [spec['function'] for spec in specs])
+        self.assertDictEqual({'team': 'data', 'owner': 'a'}, specs[0]['tags'])
+        self.assertEqual(['requests', 'jsonschema'], specs[0]['layers'])
+        self.assertEqual(['requests'], specs[1]['layers'])
+        self.assertEqual(60, specs[1]['timeout'])
+        self.assertEqual(128, specs[0]['memory'])
+
+    def test_expand_manifest_incorrect(self):
+        manifest = {'functions': [{'function': 'func_a', 'handlr': 'typo'}, {'function': 'func_a'}]}
+        with self.assertRaises(Exception) as context:
+            expand_manifest(manifest)
+        message = str(context.exception)
+        self.assertIn('handlr', message)
+        self.assertIn('missing: handler, runtime, role', message)
+        self.assertIn('more than once: func_a', message)
+
+    def test_load_manifest(self):
+        json_path = os.path.join(self.temp_dir.name, 'manifest.json')
+        with open(json_path, 'w') as f:
+            json.dump(self.manifest, f)
+        self.assertDictEqual(self.manifest, load_manifest(json_path))
+        try:
+            import yaml
+        except ImportError:
+            self.skipTest('PyYAML is not installed')
+        yaml_path = os.path.join(self.temp_dir.name, 'manifest.yaml')
+        with open(yaml_path, 'w') as f:
+            yaml.safe_dump(self.manifest, f)
+        self.assertDictEqual(self.manifest, load_manifest(yaml_path))
+
+    def test_build_manifest(self):
+        client = MagicMock()
+        client.list_layer_versions.side_effect = lambda LayerName, MaxItems: {
+            'ResponseMetadata': {'HTTPStatusCode': 200},
+            'LayerVersions': [{'LayerVersionArn': f'arn:aws:lambda:us-east-2:157648923453:layer:{LayerName}:1'}]
+        }
+        client.get_role.return_value = {'Role': {'Arn': 'arn:aws:iam::157648923453:role/Data_Lambda_Full_Access'}}
+        with patch('builtins.print') as _, patch('boto3.client') as client_mock:
+            client_mock.return_value = client
+            payloads = build_manifest(self.manifest, credentials=self.aws_credentials,
+                                      output_dir=self.temp_dir.name, max_workers=32)
+            self.assertEqual(2, client.list_layer_versions.call_count)
+            self.assertEqual(1, client.get_role.call_count)
+            lambda_configs = [kwargs['config'] for args, kwargs in client_mock.call_args_list
+                              if args[0] == 'lambda']
+            self.assertEqual([32], [config.max_pool_connections for config in lambda_configs])
+
+        self.assertEqual(['arn:aws:lambda:us-east-2:157648923453:layer:requests:1',
+                          'arn:aws:lambda:us-east-2:157648923453:layer:jsonschema:1'], payloads['func_a']['Layers'])
+        self.assertEqual(256, payloads['func_b']['MemorySize'])
+        with open(os.path.join(self.temp_dir.name, 'func_a.json')) as f:
+            self.assertDictEqual(payloads['func_a'], json.load(f))
+        with open(os.path.join(self.temp_dir.name, 'custom.json')) as f:
+            self.assertDictEqual(payloads['func_b'], json.load(f))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import time
+import unittest
+from unittest.mock import patch
+from src.aws_clients import get_client, get_rate_limiter
+from src.check_lambda_function_exists import check_lambda_exists, check_lambda_exists_batch
+from src.create_lambda_deployment_json import get_iam_role_arn, get_lambda_layer_latest_version
+from src.fake_aws import FakeAWSBackend
+from benchmarks.run_benchmarks import run_workload, compare, WORKLOADS, CREDENTIALS
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.aws_credentials = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'us-east-2'}
+        self.backend = FakeAWSBackend(seed=0).install()
+        self.backend.add_function('data_domotz_api')
+        self.backend.add_role('Data_Lambda_Full_Access')
+        self.backend.add_layer('requests', versions=14)
+
+    def tearDown(self) -> None:
+        self.backend.uninstall()
+
+    def test_helpers_against_fake(self):
+        with patch('builtins.print') as _:
+            self.assertEqual(1, check_lambda_exists('data_domotz_api', self.aws_credentials))
+            self.assertEqual(0, check_lambda_exists('incorrectfunction', self.aws_credentials))
+            self.assertEqual('arn:aws:iam::123456789012:role/Data_Lambda_Full_Access',
+                             get_iam_role_arn('Data_Lambda_Full_Access', self.aws_credentials))
+            self.assertEqual('', get_iam_role_arn('Incorrect_Lambda_Role', self.aws_credentials))
+            layer_arn, _ = get_lambda_layer_latest_version('requests', self.aws_credentials)
+            self.assertEqual('arn:aws:lambda:us-east-2:123456789012:layer:requests:14', layer_arn)
+            self.assertEqual(0, check_lambda_exists('data_domotz_api', dict(self.aws_credentials,
+                                                                            region='us-west-1')))
+
+    def test_listing_pagination(self):
+        for index in range(120):
+            self.backend.add_function(f'function_{index}')
+        with patch('builtins.print') as _:
+            response = check_lambda_exists_batch(['function_0', 'function_119', 'missing'], self.aws_credentials,
+                                                 use_listing=True)
+        self.assertDictEqual({'function_0': 1, 'function_119': 1, 'missing': 0}, response)
+        self.assertEqual(3, self.backend.call_counts['ListFunctions'])
+
+    def test_latency_and_throttling(self):
+        self.backend.latency = {'GetFunction': 0.05}
+        client = get_client('lambda', self.aws_credentials)
+        start = time.perf_counter()
+        client.get_function(FunctionName='data_domotz_api')
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+        self.backend.latency = 0.0
+        self.backend.throttle_rate = 1.0
+        with self.assertRaises(Exception) as context:
+            client.get_function(FunctionName='data_domotz_api')
+        self.assertIn('ThrottlingException', str(context.exception))
+        self.assertEqual(1, self.backend.throttle_counts['GetFunction'])
+
+    def test_benchmark_harness(self):
+        self.backend.uninstall()
+        # a bucket slowed down by an earlier workload is reset
+        get_rate_limiter(CREDENTIALS).throttled()
+        result = run_workload(WORKLOADS['resolve_layers_and_role_8_layers'], iterations=2, latency=0.0,
+                              throttle_rate=0.0)
+        self.assertEqual(18, result['aws_calls'])
+        self.assertLessEqual(result['p50'], result['p99'])
+        self.assertIsNone(get_rate_limiter(CREDENTIALS).rate)
+        parameters = {'latency': 0.02, 'throttle_rate': 0.0}
+        regressions = compare(dict(parameters, workloads={'a': {'p50': 2.0}, 'b': {'p50': 1.0}}),
+                              dict(parameters, workloads={'a': {'p50': 1.0}, 'b': {'p50': 1.0}}), threshold=0.2)
+        self.assertEqual(1, len(regressions))
+        with self.assertRaises(Exception):
+            compare(dict(parameters, workloads={}), dict(parameters, throttle_rate=0.1, workloads={}), threshold=0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from src.data_ci import main
+from src.fake_aws import FakeAWSBackend
+from src.helper_daemon import LookupDaemon, DaemonUnavailable, request, run_via_daemon
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.aws_credentials = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'us-east-2'}
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.temp_dir.name, 'daemon.sock')
+        self.environment = patch.dict(os.environ, {'DATA_CI_DAEMON_SOCKET': self.socket_path})
+        self.environment.start()
+        self.backend = FakeAWSBackend().install()
+        self.backend.add_function('data_domotz_api')
+        self.backend.add_layer('requests', versions=2)
+        self.role_arn = self.backend.add_role('Lambda_Role')
+
+        self.daemon = LookupDaemon(cache=True)
+        self.print_patch = patch('builtins.print')
+        self.print_patch.start()
+        self.thread = threading.Thread(target=self.daemon.serve)
+        self.thread.start()
+        for _ in range(100):
+            if os.path.exists(self.socket_path):
+                break
+            time.sleep(0.01)
+
+    def tearDown(self) -> None:
+        self.daemon.stop()
+        self.thread.join()
+        self.print_patch.stop()
+        self.backend.uninstall()
+        self.environment.stop()
+        self.temp_dir.cleanup()
+
+    def test_operations(self):
+        self.assertEqual(os.getpid(), request('ping')['pid'])
+        function = MagicMock()
+        self.assertEqual(1, run_via_daemon('check_lambda_exists', function, function_name='data_domotz_api',
+                                           credentials=self.aws_credentials))
+        self.assertDictEqual({'data_domotz_api': 1, 'missing': 0},
+                             run_via_daemon('check_lambda_exists_batch', function,
+                                            function_names=['data_domotz_api', 'missing'],
+                                            credentials=self.aws_credentials))
+        function.assert_not_called()
+
+        # only the callers asking for the cache are served from it
+        for use_cache in [False, False, True, True]:
+            layer_arns, role_arns = request('resolve_lookups', layer_names=['requests'], role_names=['Lambda_Role'],
+                                            credentials=self.aws_credentials, use_cache=use_cache)
+            self.assertDictEqual({'requests': self.backend.layer_arn('requests', 2)}, layer_arns)
+            self.assertDictEqual({'Lambda_Role': self.role_arn}, role_arns)
+        self.assertEqual(3, self.backend.call_counts['ListLayerVersions'])
+        self.assertEqual(3, self.backend.call_counts['GetRole'])
+
+        self.assertEqual(1, request('invalidate', kind='layer', name='requests'))
+        request('resolve_lookups', layer_names=['requests'], role_names=[], credentials=self.aws_credentials,
+                use_cache=True)
+        self.assertEqual(4, self.backend.call_counts['ListLayerVersions'])
+
+    def test_errors(self):
+        with self.assertRaises(Exception) as context:
+            request('resolve_lookups', layer_names=['missing'], role_names=[], credentials=self.aws_credentials)
+        self.assertNotIsInstance(context.exception, DaemonUnavailable)
+        self.assertIn('The layer missing could not be found', str(context.exception))
+        with self.assertRaises(Exception):
+            request('unknown_operation')
+
+    def test_fallback(self):
+        function = MagicMock(return_value=0)
+        # other default credentials than the daemon
+        with patch.dict(os.environ, {'AWS_PROFILE': 'other_account'}):
+            self.assertEqual(0, run_via_daemon('check_lambda_exists', function, function_name='data_domotz_api',
+                                               credentials=None))
+        function.assert_called_once_with(function_name='data_domotz_api', credentials=None)
+        # no daemon
+        with patch.dict(os.environ, {'DATA_CI_DAEMON_SOCKET': os.path.join(self.temp_dir.name, 'missing.sock')}):
+            self.assertEqual(0, run_via_daemon('check_lambda_exists', function, function_name='data_domotz_api',
+                                               credentials=self.aws_credentials))
+        self.assertEqual(2, function.call_count)
+
+    def test_fallback_without_daemon_cache(self):
+        self.daemon.cache = None
+        function = MagicMock(return_value=({}, {}))
+        self.assertEqual(({}, {}), run_via_daemon('resolve_lookups', function, use_cache=True, layer_names=[],
+                                                  role_names=[], credentials=self.aws_credentials))
+        function.assert_called_once_with(layer_names=[], role_names=[], credentials=self.aws_credentials)
+
+    def test_fallback_when_daemon_hangs(self):
+        # the kernel accepts the connections of a daemon that never answers
+        path = os.path.join(self.temp_dir.name, 'hung.sock')
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener, \
+                patch('src.helper_daemon.READ_TIMEOUT', 0.1), \
+                patch.dict(os.environ, {'DATA_CI_DAEMON_SOCKET': path}):
+            listener.bind(path)
+            listener.listen(1)
+            function = MagicMock(return_value=1)
+            self.assertEqual(1, run_via_daemon('check_lambda_exists', function, function_name='data_domotz_api',
+                                               credentials=self.aws_credentials))
+            function.assert_called_once_with(function_name='data_domotz_api', credentials=self.aws_credentials)
+
+    def test_entry_points(self):
+        output_path = os.path.join(self.temp_dir.name, 'function.json')
+        requests = request('ping')['requests']
+        self.assertEqual(0, main(['deployment-json', '--function', 'data_domotz_api', '--handler', 'main.handler',
+                                  '--runtime', 'python3.8', '--role', 'Lambda_Role', '--layers', 'requests',
+                                  '--access', '123', '--secret', 'abc', '--output', output_path]))
+        self.assertEqual(0, main(['exists', '--function', 'data_domotz_api', '--access', '123', '--secret', 'abc',
+                                  '--output', os.path.join(self.temp_dir.name, 'exists.txt')]))
+        self.assertEqual(requests + 3, request('ping')['requests'])
+        with open(output_path, 'r') as f:
+            self.assertEqual(self.role_arn, json.load(f)['Role'])
+
+        # --cache callers are served from the cache of the daemon
+        for _ in range(2):
+            self.assertEqual(0, main(['deployment-json', '--function', 'data_domotz_api', '--handler', 'main.handler',
+                                      '--runtime', 'python3.8', '--role', 'Lambda_Role', '--layers', 'requests',
+                                      '--access', '123', '--secret', 'abc', '--output', output_path, '--cache']))
+        self.assertEqual(2, self.backend.call_counts['ListLayerVersions'])
+        self.assertEqual(requests + 6, request('ping')['requests'])
+
+
+if __name__ == '__main__':
+    unittest.main()
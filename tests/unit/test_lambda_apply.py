@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.create_lambda_deployment_json import create_json
+from src.data_ci import main
+from src.deployment_diff import load_state, save_pending_state
+from src.fake_aws import FakeAWSBackend
+from src.lambda_apply import apply_function, apply_functions
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.aws_credentials = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'us-east-2'}
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.backend = FakeAWSBackend(pending_polls=2).install()
+        self.backend.add_function('existing_function', Timeout=3)
+        self.role_arn = self.backend.add_role('Lambda_Role')
+
+    def tearDown(self) -> None:
+        self.backend.uninstall()
+        self.temp_dir.cleanup()
+
+    def _payload(self, function_name: str, timeout: int = 30) -> dict:
+        with patch('builtins.print') as _:
+            return create_json(function_name=function_name, runtime='python3.7', role=self.role_arn,
+                               handler='main.handler', description=None, timeout=timeout, tags={'team': 'data'})
+
+    def test_create(self):
+        with patch('builtins.print') as _:
+            result = apply_function(self._payload('new_function'), zip_file=b'code', credentials=self.aws_credentials,
+                                    poll_interval=0)
+        self.assertEqual('create', result['action'])
+        self.assertEqual('Successful', result['status'])
+        configuration = self.backend._functions[('us-east-2', 'new_function')]['Configuration']
+        self.assertEqual('Active', configuration['State'])
+        self.assertEqual(30, configuration['Timeout'])
+        # two polls see it Pending, the third one Active
+        self.assertEqual(3, self.backend.call_counts['GetFunctionConfiguration'])
+
+    def test_update(self):
+        with patch('builtins.print') as _:
+            result = apply_function(self._payload('existing_function'), zip_file=b'code',
+                                    credentials=self.aws_credentials, poll_interval=0)
+        self.assertEqual('update', result['action'])
+        self.assertEqual('Successful', result['status'])
+        function = self.backend._functions[('us-east-2', 'existing_function')]
+        self.assertEqual(30, function['Configuration']['Timeout'])
+        self.assertEqual('Successful', function['Configuration']['LastUpdateStatus'])
+        self.assertEqual({'team': 'data'}, function['Tags'])
+        self.assertEqual(1, self.backend.call_counts['UpdateFunctionCode'])
+        self.assertEqual(1, self.backend.call_counts['UpdateFunctionConfiguration'])
+
+    def test_failures(self):
+        self.backend.failing_functions.add('failing_function')
+        with patch('builtins.print') as _:
+            failed = apply_function(self._payload('failing_function'), zip_file=b'code',
+                                    credentials=self.aws_credentials, poll_interval=0)
+            without_code = apply_function(self._payload('new_function'), credentials=self.aws_credentials,
+                                          poll_interval=0)
+            timed_out = apply_function(self._payload('existing_function'), zip_file=b'code',
+                                       credentials=self.aws_credentials, poll_interval=0.01, timeout=0)
+        self.assertEqual(('create', 'Failed'), (failed['action'], failed['status']))
+        self.assertIn('Failed to create the function', failed['error'])
+        self.assertEqual(('create', 'Failed'), (without_code['action'], without_code['status']))
+        self.assertEqual(('update', 'Failed'), (timed_out['action'], timed_out['status']))
+        self.assertIn('Timed out', timed_out['error'])
+
+    def test_apply_functions_commits_state(self):
+        self.backend.failing_functions.add('failing_function')
+        payloads = [self._payload(name) for name in ['existing_function', 'new_function', 'failing_function']]
+        state_file = os.path.join(self.temp_dir.name, 'state.json')
+        save_pending_state(state_file, {payload['FunctionName']: payload for payload in payloads})
+        with patch('builtins.print') as _:
+            results = apply_functions(payloads, zip_file=b'code', credentials=self.aws_credentials, max_workers=3,
+                                      poll_interval=0, state_file=state_file)
+        self.assertEqual(['existing_function', 'new_function', 'failing_function'], list(results))
+        self.assertEqual(['Successful', 'Successful', 'Failed'], [result['status'] for result in results.values()])
+        self.assertEqual(['existing_function', 'new_function'], sorted(load_state(state_file)))
+        self.assertEqual(['failing_function'], list(load_state(f'{state_file}.pending')))
+
+    def test_command(self):
+        config_path = os.path.join(self.temp_dir.name, 'lambda_config.json')
+        zip_path = os.path.join(self.temp_dir.name, 'my_lambda_func.zip')
+        report_path = os.path.join(self.temp_dir.name, 'report.json')
+        with open(config_path, 'w') as f:
+            json.dump(self._payload('new_function'), f)
+        with open(zip_path, 'wb') as f:
+            f.write(b'code')
+        with patch('builtins.print') as _:
+            self.assertEqual(0, main(['apply', '--configs', config_path, '--zip-file', zip_path, '--poll-interval',
+                                      '0', '--access', '123', '--secret', 'abc', '--output', report_path]))
+            self.backend.failing_functions.add('new_function')
+            with self.assertRaises(SystemExit):
+                main(['apply', '--configs', config_path, '--zip-file', zip_path, '--poll-interval', '0',
+                      '--access', '123', '--secret', 'abc', '--output', report_path])
+        with open(report_path, 'r') as f:
+            report = json.load(f)
+        self.assertEqual([('new_function', 'update', 'Failed')],
+                         [(result['function'], result['action'], result['status']) for result in report])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from src.aws_clients import clear_clients
+from src.create_lambda_deployment_json import get_iam_role_arn, get_lambda_layer_latest_version
+from src.lookup_cache import LookupCache
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.aws_credentials = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'us-east-2'}
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.layer_arn = 'arn:aws:lambda:us-east-2:157648923453:layer:requests:14'
+        clear_clients()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        clear_clients()
+
+    def test_cache_persistence(self):
+        cache = LookupCache(cache_dir=self.temp_dir.name)
+        self.assertIsNone(cache.get('layer', 'requests', self.aws_credentials))
+        cache.set('layer', 'requests', self.layer_arn, self.aws_credentials)
+        other_cache = LookupCache(cache_dir=self.temp_dir.name)
+        self.assertEqual(self.layer_arn, other_cache.get('layer', 'requests', self.aws_credentials))
+        self.assertIsNone(other_cache.get('layer', 'requests', dict(self.aws_credentials, region='us-west-1')))
+
+    def test_cache_ttl(self):
+        cache = LookupCache(cache_dir=self.temp_dir.name, ttls={'layer': 10})
+        with patch('src.lookup_cache.time') as time_mock:
+            time_mock.time.return_value = 1000
+            cache.set('layer', 'requests', self.layer_arn, self.aws_credentials)
+            time_mock.time.return_value = 1009
+            self.assertEqual(self.layer_arn, cache.get('layer', 'requests', self.aws_credentials))
+            time_mock.time.return_value = 1010
+            self.assertIsNone(cache.get('layer', 'requests', self.aws_credentials))
+
+    def test_cache_refresh(self):
+        LookupCache(cache_dir=self.temp_dir.name).set('layer', 'requests', self.layer_arn, self.aws_credentials)
+        cache = LookupCache(cache_dir=self.temp_dir.name, refresh=True)
+        self.assertIsNone(cache.get('layer', 'requests', self.aws_credentials))
+
+    def test_cache_invalidate(self):
+        cache = LookupCache(cache_dir=self.temp_dir.name)
+        cache.set('layer', 'requests', self.layer_arn, self.aws_credentials)
+        cache.set('layer', 'jsonschema', self.layer_arn, self.aws_credentials)
+        cache.set('role', 'Data_Lambda_Full_Access', 'arn:aws:iam::157648923453:role/Data_Lambda_Full_Access')
+        self.assertEqual(1, cache.invalidate(kind='layer', name='requests'))
+        cache = LookupCache(cache_dir=self.temp_dir.name)
+        self.assertIsNone(cache.get('layer', 'requests', self.aws_credentials))
+        self.assertIsNotNone(cache.get('layer', 'jsonschema', self.aws_credentials))
+        self.assertEqual(2, cache.invalidate())
+        self.assertIsNone(cache.get('role', 'Data_Lambda_Full_Access'))
+
+    def test_cache_invalidated_by_other_process(self):
+        cache = LookupCache(cache_dir=self.temp_dir.name)
+        cache.set('layer', 'requests', self.layer_arn, self.aws_credentials)
+        LookupCache(cache_dir=self.temp_dir.name).invalidate(kind='layer', name='requests')
+        self.assertIsNone(cache.get('layer', 'requests', self.aws_credentials))
+        cache.set('layer', 'jsonschema', self.layer_arn, self.aws_credentials)
+        self.assertIsNone(LookupCache(cache_dir=self.temp_dir.name).get('layer', 'requests', self.aws_credentials))
+
+    def test_cache_default_credentials_identity(self):
+        cache = LookupCache(cache_dir=self.temp_dir.name)
+        with patch('src.lookup_cache.default_identity') as identity_mock:
+            identity_mock.return_value = ('key_a', 'us-east-2')
+            cache.set('layer', 'requests', self.layer_arn)
+            self.assertEqual(self.layer_arn, cache.get('layer', 'requests'))
+            identity_mock.return_value = ('key_b', 'us-east-2')
+            self.assertIsNone(cache.get('layer', 'requests'))
+            identity_mock.return_value = ('key_a', 'us-west-1')
+            self.assertIsNone(cache.get('layer', 'requests'))
+
+    def test_helpers_use_cache(self):
+        cache = LookupCache(cache_dir=self.temp_dir.name)
+        client = MagicMock()
+        client.list_layer_versions.return_value = {'ResponseMetadata': {'HTTPStatusCode': 200},
+                                                   'LayerVersions': [{'LayerVersionArn': self.layer_arn}]}
+        client.get_role.return_value = {'Role': {'Arn': 'arn:aws:iam::157648923453:role/Data_Lambda_Full_Access'}}
+        with patch('builtins.print') as _, patch('boto3.client') as client_mock:
+            client_mock.return_value = client
+            for _ in range(3):
+                layer_arn, _ = get_lambda_layer_latest_version('requests', self.aws_credentials, cache=cache)
+                role_arn = get_iam_role_arn('Data_Lambda_Full_Access', self.aws_credentials, cache=cache)
+                self.assertEqual(self.layer_arn, layer_arn)
+                self.assertEqual('arn:aws:iam::157648923453:role/Data_Lambda_Full_Access', role_arn)
+            self.assertEqual(1, client.list_layer_versions.call_count)
+            self.assertEqual(1, client.get_role.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import base64
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+from src.create_lambda_deployment_json import create_json
+from src.data_ci import main
+from src.fake_aws import FakeAWSBackend
+from src.lambda_apply import apply_function
+from src.package_builder import PackageBuilder, code_sha256, code_output_path, collect_sources, fill_code
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.aws_credentials = {'aws_key': '123', 'aws_secret': 'abc', 'region': 'us-east-2'}
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.temp_dir.name, 'src')
+        self.cache_dir = os.path.join(self.temp_dir.name, 'cache')
+        self.zip_path = os.path.join(self.temp_dir.name, 'my_lambda_func.zip')
+        self.files = {
+            'lambda_function.py': 'def lambda_handler(event, context):\n    return helpers.run(event)\n' * 20,
+            'helpers/__init__.py': '',
+            'helpers/run.py': 'def run(event):\n    return event\n',
+            'helpers/__pycache__/run.cpython-37.pyc': 'compiled',
+        }
+        for name, content in self.files.items():
+            self._write(name, content)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _write(self, name: str, content: str):
+        path = os.path.join(self.source_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def _build(self) -> dict:
+        with patch('builtins.print') as _:
+            return PackageBuilder(cache_dir=self.cache_dir, max_workers=2).build(self.source_dir, self.zip_path)
+
+    def test_collect_sources(self):
+        self.assertEqual(['helpers/__init__.py', 'helpers/run.py', 'lambda_function.py'],
+                         [name for name, _ in collect_sources(self.source_dir)])
+
+    def test_build(self):
+        package = self._build()
+        self.assertEqual((3, 0), (package['files'], package['cached']))
+        with open(self.zip_path, 'rb') as f:
+            content = f.read()
+        self.assertEqual(code_sha256(content), package['code_sha256'])
+        self.assertEqual(len(content), package['size'])
+        with zipfile.ZipFile(self.zip_path) as package_zip:
+            self.assertIsNone(package_zip.testzip())
+            self.assertEqual(['helpers/__init__.py', 'helpers/run.py', 'lambda_function.py'], package_zip.namelist())
+            for name in package_zip.namelist():
+                self.assertEqual(self.files[name], package_zip.read(name).decode())
+                self.assertEqual((1980, 1, 1, 0, 0, 0), package_zip.getinfo(name).date_time)
+
+    def test_incremental_and_deterministic(self):
+        first = self._build()
+        os.utime(os.path.join(self.source_dir, 'lambda_function.py'), (0, 0))
+        second = self._build()
+        self.assertEqual(first['code_sha256'], second['code_sha256'])
+        self.assertEqual(3, second['cached'])
+
+        self._write('helpers/run.py', 'def run(event):\n    return {"event": event}\n')
+        third = self._build()
+        self.assertNotEqual(first['code_sha256'], third['code_sha256'])
+        self.assertEqual(2, third['cached'])
+
+    def test_fill_code_and_skip_unchanged(self):
+        package = self._build()
+        with FakeAWSBackend() as backend, patch('builtins.print') as _:
+            backend.add_function('deployed_function', CodeSha256=package['code_sha256'])
+            backend.add_function('outdated_function', CodeSha256='outdated')
+            payloads = [create_json(function_name=name, runtime='python3.7', role='arn:aws:iam::1:role/Lambda_Role',
+                                    handler='lambda_function.lambda_handler', description=None)
+                        for name in ['deployed_function', 'outdated_function', 'new_function']]
+            filled = [fill_code(payload, package, self.aws_credentials, skip_unchanged=True) for payload in payloads]
+            self.assertEqual([False, True, True], filled)
+            self.assertNotIn('Code', payloads[0])
+            with open(self.zip_path, 'rb') as f:
+                self.assertEqual(f.read(), base64.b64decode(payloads[2]['Code']['ZipFile']))
+
+            results = [apply_function(payload, credentials=self.aws_credentials, poll_interval=0)
+                       for payload in payloads]
+            self.assertEqual(['Successful'] * 3, [result['status'] for result in results])
+            self.assertEqual([False, True, True], [result['code_uploaded'] for result in results])
+            self.assertEqual(1, backend.call_counts['UpdateFunctionCode'])
+            for name in ['outdated_function', 'new_function']:
+                self.assertEqual(package['code_sha256'],
+                                 backend._functions[('us-east-2', name)]['Configuration']['CodeSha256'])
+
+            # the zip of an unchanged function is not uploaded again by apply either
+            result = apply_function(payloads[1], credentials=self.aws_credentials, poll_interval=0)
+            self.assertEqual((False, 1), (result['code_uploaded'], backend.call_counts['UpdateFunctionCode']))
+
+    def test_command(self):
+        config_path = os.path.join(self.temp_dir.name, 'lambda_config.json')
+        with open(config_path, 'w') as f:
+            json.dump({'FunctionName': 'new_function'}, f)
+        with patch('builtins.print') as _:
+            self.assertEqual(0, main(['package', '--source-dir', self.source_dir, '--output', self.zip_path,
+                                      '--cache-dir', self.cache_dir, '--configs', config_path]))
+        # the config itself stays usable with the aws CLI
+        with open(config_path, 'r') as f:
+            self.assertDictEqual({'FunctionName': 'new_function'}, json.load(f))
+        self.assertEqual(os.path.join(self.temp_dir.name, 'lambda_config.code.json'), code_output_path(config_path))
+        with open(code_output_path(config_path), 'r') as f:
+            payload = json.load(f)
+        with open(self.zip_path, 'rb') as f:
+            self.assertEqual(f.read(), base64.b64decode(payload['Code']['ZipFile']))
+
+
+if __name__ == '__main__':
+    unittest.main()